@@ -11,7 +11,8 @@ import logging
 import configparser
 from urllib.parse import unquote
 from src.app_func import (
-    init_db,check_connection,
+    init_db,check_connection,get_pool_metrics,db_pool,fill_pool,
+    run_db,DBTimeout,shutdown_executor,
     root,step1_init,step1_start,step2_status,step2_start,
     set_selected_announcements,set_selected_announcements_bydate,
     step3_result,
@@ -22,7 +23,8 @@ from src.app_func import (
     ann_checkbox_set,
     app_approval,
     app_execution,
-    app_knowledge
+    app_knowledge,
+    llm_metrics_status
 )
 from src.string_management import URLS, TasksKey
 from src.logging_config import setup_logging
@@ -39,6 +41,8 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # 啟動前檢查：確認 config.ini, department JSON 及各 department 的 md 檔
     verify_departments_from_config(logger=logger)
+    # Open min_size DB connections now rather than on the first requests
+    await run_db(fill_pool, timeout=None)
 
     # 啟動背景任務並記錄，確保 shutdown 時能取消
     task = asyncio.create_task(loop_maintain_tasks(my_tasks))
@@ -51,9 +55,15 @@ async def lifespan(app: FastAPI):
             await task
         except asyncio.CancelledError:
             pass
+        shutdown_executor()
+        db_pool.close_all()
 
 app = FastAPI(lifespan = lifespan)
 
+@app.exception_handler(DBTimeout)
+async def db_timeout_handler(request: Request, exc: DBTimeout):
+    return HTMLResponse(content="<div class='error'>Database is busy, please retry.</div>", status_code=504)
+
 # main web page route return HTLM response
 @app.get(URLS.ROOT.value,response_class=HTMLResponse)
 async def api_root(task_id: str = 'none',step: str = 'step1'):
@@ -108,14 +118,16 @@ async def api_step3_select(request: Request,task_id: str=None):
 @app.get(URLS.STEP4_RESULT_STATUS.value,response_class=HTMLResponse)
 async def api_step4_result_status(task_id: str):
     # return current status of the final task
-    return HTMLResponse(content=step4_result_status(task_id,my_tasks), status_code=200)
+    return HTMLResponse(content=await run_db(step4_result_status, task_id, my_tasks), status_code=200)
 @app.get(URLS.SAVE_TO_DB.value,response_class=HTMLResponse)
 async def api_step4_save_to_db(task_id: str):
-    # save an ann result to db
-    return HTMLResponse(content=save_to_db(task_id,my_tasks), status_code=200)
+    # save an ann result to db; no timeout: a write that outlives it would still commit
+    return HTMLResponse(content=await run_db(save_to_db, task_id, my_tasks, timeout=None), status_code=200)
 @app.get(URLS.LOOKUP_DB.value,response_class=HTMLResponse)
-async def api_lookup_db():
-    return HTMLResponse(content=lookup_db(), status_code=200)
+async def api_lookup_db(cursor: str = None, date_from: str = None, date_to: str = None,
+                        site: str = None, department: str = None, sended: str = '1'):
+    content = await run_db(lookup_db, cursor, date_from, date_to, site, department, sended)
+    return HTMLResponse(content=content, status_code=200)
 
 @app.patch(URLS.ANN_CHECKBOX_SET.value,response_class=JSONResponse)
 async def api_ann_checkbox_set(task_id:str,ann_idx :str,checkbox_name :str):
@@ -129,16 +141,20 @@ async def heartbeat(task_id: str):
 
 @app.get(URLS.SERVER_STATUS.value)
 async def server_status():
-    return {"status": "running"}
+    return {"status": "running", "db_pool": get_pool_metrics()}
+
+@app.get(URLS.LLM_METRICS.value, response_class=JSONResponse)
+async def api_llm_metrics(task_id: str = None):
+    return JSONResponse(content=llm_metrics_status(task_id), status_code=200)
 
 
 @app.get(URLS.APPROVAL_LIST.value, response_class=HTMLResponse)
 async def api_approval_list():
-    return HTMLResponse(content=app_approval.approval_list(), status_code=200)
+    return HTMLResponse(content=await run_db(app_approval.approval_list), status_code=200)
 
 @app.get(URLS.APPROVAL_DETAIL.value, response_class=HTMLResponse)
 async def api_approval_detail(task_id: str):
-    return HTMLResponse(content=app_approval.approval_detail(task_id), status_code=200)
+    return HTMLResponse(content=await run_db(app_approval.approval_detail, task_id), status_code=200)
 
 @app.post(URLS.APPROVAL_ACTION.value, response_class=HTMLResponse)
 async def api_approval_action(request: Request):
@@ -150,7 +166,7 @@ async def api_approval_patch_dept(request: Request):
 
 @app.get(URLS.EXECUTION_LIST.value, response_class=HTMLResponse)
 async def api_execution_list():
-    return HTMLResponse(content=app_execution.execution_list(), status_code=200)
+    return HTMLResponse(content=await run_db(app_execution.execution_list), status_code=200)
 
 @app.api_route(URLS.EXECUTION_ACTION.value, methods=["GET", "POST"], response_class=HTMLResponse)
 async def api_execution_action(request: Request):
@@ -181,13 +197,21 @@ async def api_knowledge_content(dept_name: str):
     return await app_knowledge.knowledge_content_endpoint(dept_name)
 
 @app.post(URLS.KNOWLEDGE_SAVE.value, response_class=PlainTextResponse)
-async def api_knowledge_save(dept_name: str, request: Request):
+async def api_knowledge_save(dept_name: str, request: Request, background_tasks: BackgroundTasks):
     config = configparser.ConfigParser()
     config.read('config.ini')
     if config.getint('LLM', 'llm_classifier', fallback=0) != 1:
         return PlainTextResponse("Feature disabled", status_code=403)
     form = await request.form()
-    return await app_knowledge.knowledge_save_endpoint(dept_name, form)
+    return await app_knowledge.knowledge_save_endpoint(dept_name, form, background_tasks)
+
+@app.get(URLS.KNOWLEDGE_RECLASSIFY_REPORT.value, response_class=HTMLResponse)
+async def api_knowledge_reclassify_report(dept_name: str):
+    config = configparser.ConfigParser()
+    config.read('config.ini')
+    if config.getint('LLM', 'llm_classifier', fallback=0) != 1:
+        return HTMLResponse("Feature disabled", status_code=403)
+    return await app_knowledge.knowledge_reclassify_report_endpoint(dept_name)
 
 if __name__ == "__main__":
     # 啟動前再次檢查（在直接以 python 啟動時適用）
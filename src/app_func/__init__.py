@@ -9,9 +9,12 @@ from .app_step3_patch_department import patch_department_select
 from .app_step4_result_status import step4_result_status
 from .app_save_to_db import save_to_db
 from src.db_scripts.db_init import init_db,check_connection
+from src.db_scripts.db_utility import get_pool_metrics,db_pool,fill_pool
+from src.db_scripts.async_db import run_db,DBTimeout,shutdown_executor
 from .app_lookup_db import lookup_db
 from .app_heart_beat import update_time,loop_maintain_tasks
 from .app_ann_checkbox_set import ann_checkbox_set
 from . import app_approval
 from . import app_execution
 from . import app_knowledge
+from .app_llm_metrics import llm_metrics_status
@@ -1,11 +1,13 @@
 from fastapi import Request
 from src.db_scripts.task_manager import (
     get_pending_tasks, get_task_messages, update_task_status, 
-    approve_task_transaction, update_task_remark, get_task_by_id
+    approve_task_transaction, update_task_remark, get_task_by_id,
+    get_task_message_departments
 )
 from src.db_scripts.message_manager import (
     get_message_by_id
 )
+from src.db_scripts.async_db import run_db
 from src.htmx_gen import gen_approval_view
 from src.utils.department_provider import get_department_names
 
@@ -36,7 +38,8 @@ async def approval_action(request: Request) -> str:
     if action == 'approve':
         if task_id in pending_approvals:
             modified_messages = pending_approvals[task_id]
-            original_messages = get_task_messages(task_id)
+            # Only the columns the change log compares
+            original_messages = await run_db(get_task_message_departments, task_id)
             original_map = {m['id']: m for m in original_messages}
             
             updates = []
@@ -78,22 +81,23 @@ async def approval_action(request: Request) -> str:
                     'cc_departments': list(mod_cc)
                 })
             
-            # Execute transaction (update message departments and task status)
-            approve_task_transaction(task_id, updates)
+            # Execute transaction (update message departments and task status).
+            # Writes wait without a timeout: the commit would happen anyway and the remark below must follow it
+            await run_db(approve_task_transaction, task_id, updates, timeout=None)
             
             # Aggregate and save change logs to task remark (append)
             if change_logs:
                 aggregated = "; ".join(change_logs)
-                update_task_remark(task_id, aggregated)
+                await run_db(update_task_remark, task_id, aggregated, timeout=None)
             
     elif action == 'reject':
-        update_task_status(task_id, -1)
+        await run_db(update_task_status, task_id, -1, timeout=None)
         
     # Clear temporary storage
     if task_id in pending_approvals:
         del pending_approvals[task_id]
         
-    return approval_list() # Refresh list
+    return await run_db(approval_list) # Refresh list
 
 async def approval_patch_dept(request: Request) -> str:
     form = await request.form()
@@ -113,7 +117,7 @@ async def approval_patch_dept(request: Request) -> str:
         
         if task_id not in pending_approvals:
             # If not in cache, reload from DB
-            pending_approvals[task_id] = get_task_messages(task_id)
+            pending_approvals[task_id] = await run_db(get_task_messages, task_id)
             
         # Find the message in temporary storage
         msg = next((m for m in pending_approvals[task_id] if m['id'] == msg_id), None)
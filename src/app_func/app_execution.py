@@ -1,5 +1,6 @@
 from fastapi import Request
 from src.db_scripts.task_manager import get_approved_tasks, get_task_messages, update_task_status, get_task_by_id
+from src.db_scripts.async_db import run_db
 from src.htmx_gen import gen_execution_view
 
 def execution_list() -> str:
@@ -10,8 +11,8 @@ async def execution_action(request: Request) -> str:
     # Can be GET (detail) or POST (done)
     if request.method == 'GET':
         task_id = request.query_params.get('task_id')
-        messages = get_task_messages(task_id)
-        task = get_task_by_id(task_id)
+        messages = await run_db(get_task_messages, task_id)
+        task = await run_db(get_task_by_id, task_id)
         remark = task.get('remark', '') if task else ''
         return gen_execution_view.gen_execution_detail(task_id, messages, remark)
     elif request.method == 'POST':
@@ -20,6 +21,6 @@ async def execution_action(request: Request) -> str:
         action = form.get('action')
         
         if action == 'done':
-            update_task_status(task_id, 2)
+            await run_db(update_task_status, task_id, 2, timeout=None)
             
-        return execution_list()
+        return await run_db(execution_list)
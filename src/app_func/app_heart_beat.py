@@ -4,6 +4,10 @@ import shutil
 import logging
 import configparser
 import asyncio
+from src.classifier.LLM import llm_metrics
+from src.utils.text_cache import prune_text_cache
+from src.db_scripts.db_utility import db_pool, fill_pool
+from src.db_scripts.async_db import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +25,12 @@ def update_time(task_id: str,tasks: dict):
 async def loop_maintain_tasks(tasks: dict, interval: int = default_interval, timeout: int = 600):
     while True:
         _maintain_tasks(tasks, timeout)
+        # Walks and deletes cache files; keep it off the event loop
+        await asyncio.to_thread(prune_text_cache)
+        # Closing and opening connections is network I/O
+        await run_db(db_pool.recycle_idle, timeout=None)
+        # Reopen up to min_size, so requests after a quiet period do not pay for the login
+        await run_db(fill_pool, timeout=None)
         await asyncio.sleep(interval)
 def _maintain_tasks(tasks: dict, timeout: int = default_timeout):
     config = configparser.ConfigParser()
@@ -34,6 +44,7 @@ def _maintain_tasks(tasks: dict, timeout: int = default_timeout):
             to_remove.append(task_id)
     for task_id in to_remove:
         del tasks[task_id]
+        llm_metrics.drop_task(task_id)
     #list dirs in output_base_path
     
     to_remove = set(os.listdir(output_base_path)) - set(tasks.keys())
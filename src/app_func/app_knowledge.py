@@ -1,7 +1,17 @@
+import configparser
 from pathlib import Path
+from fastapi import BackgroundTasks
 from fastapi.responses import HTMLResponse, PlainTextResponse
-from src.htmx_gen.gen_knowledge import gen_knowledge_page, gen_department_list, gen_editor
+from src.htmx_gen.gen_knowledge import gen_knowledge_page, gen_department_list, gen_editor, gen_reclassify_report
 from src.utils.department_provider import get_departments, _departments_path
+from src.classifier.reclassify import reclassify_department, latest_report
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+# Re-classify the edited department over pending/recent messages after each save
+reclassify_on_save = config.getint('LLM', 'reclassify_on_save', fallback=1) == 1
+reclassify_scope = config.get('LLM', 'reclassify_scope', fallback='pending')
+reclassify_days = config.getint('LLM', 'reclassify_days', fallback=14)
 
 def get_knowledge_desc_dir() -> Path:
     return _departments_path().parent / "Dept_description"
@@ -28,7 +38,7 @@ async def knowledge_content_endpoint(dept_name: str):
         
     return HTMLResponse(gen_editor(dept_name, content))
 
-async def knowledge_save_endpoint(dept_name: str, request_form: dict):
+async def knowledge_save_endpoint(dept_name: str, request_form: dict, background_tasks: BackgroundTasks = None):
     # Security check
     valid_depts = [d['deptname'] for d in get_departments()]
     if dept_name not in valid_depts:
@@ -43,6 +53,14 @@ async def knowledge_save_endpoint(dept_name: str, request_form: dict):
         # Ensure directory exists
         file_path.parent.mkdir(parents=True, exist_ok=True)
         file_path.write_text(content, encoding='utf-8')
+        if reclassify_on_save and background_tasks is not None:
+            background_tasks.add_task(reclassify_department, dept_name, 'llm', reclassify_scope, reclassify_days)
         return PlainTextResponse("Saved successfully")
     except Exception as e:
         return PlainTextResponse(f"Error saving: {e}", status_code=500)
+
+async def knowledge_reclassify_report_endpoint(dept_name: str):
+    valid_depts = [d['deptname'] for d in get_departments()]
+    if dept_name not in valid_depts:
+        return HTMLResponse("Invalid department", status_code=400)
+    return HTMLResponse(gen_reclassify_report(dept_name, latest_report(dept_name)))
@@ -0,0 +1,14 @@
+from src.classifier.LLM import llm_metrics, langchain_compoment
+from src.classifier.LLM.read_describe_to_decide_department import get_limiter_state
+from src.classifier.cascade_classifier import get_cascade_stats
+
+def llm_metrics_status(task_id: str = None) -> dict:
+    # return LLM call metrics (one task when task_id is given), limiter and endpoint state
+    if task_id:
+        return {'task_id': task_id, **llm_metrics.get_task_metrics(task_id)}
+    return {
+        **llm_metrics.snapshot(),
+        'limiter': get_limiter_state(),
+        'endpoints': langchain_compoment.endpoint_pool.snapshot(),
+        'cascade': get_cascade_stats(),
+    }
@@ -1,37 +1,46 @@
 import logging
-import datetime
 import configparser
-from mssql_python import connect
 
 logger = logging.getLogger(__name__)
 
-from src.db_scripts.db_utility import db_row_to_dict
-from src.string_management import TasksKey, AnnKey
+from src.db_scripts.message_manager import lookup_messages
+from src.utils.department_provider import get_department_names
+from src.app_func.app_step1_init import _get_all_crawlers
 from src.htmx_gen import gen_looked
-def lookup_db():
-    # select data from the database in these two months
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-    DB_SCHEMA = config['Database'].get('DB_SCHEMA', 'dbo')
-    qname = f"[{DB_SCHEMA}].[messages]"
-    SQL_CONNECTION_STRING = config['Database']['SQL_CONNECTION_STRING'].replace('"', '')
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+LOOKUP_PAGE_SIZE = config.getint('Database', 'lookup_page_size', fallback=50)
+
+
+def _site_names() -> list:
+    # displaySiteName is saved from the crawler's DISPLAY_NAME, so these are the values that match
+    return list(dict.fromkeys(crawler.DISPLAY_NAME for crawler in _get_all_crawlers()))
+
+
+def lookup_db(cursor: str = None, date_from: str = None, date_to: str = None,
+              site: str = None, department: str = None, sended: str = '1'):
+    '''
+    cursor: next-page cursor from the previous page; when given only the rows are returned
+    date_from / date_to: YYYY-MM-DD, inclusive
+    sended: '1' sent only, '0' not sent only, '' both
+    '''
+    filters = {'date_from': date_from or '', 'date_to': date_to or '', 'site': site or '',
+               'department': department or '', 'sended': sended if sended in ('0', '1') else ''}
     try:
-        conn = connect(SQL_CONNECTION_STRING)
-        # to do: select data from the database
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {qname}")
-        rows = cursor.fetchall()
-        ann_list = []
-        for row in rows:
-            ann = db_row_to_dict(row)
-            if ann.get(AnnKey.SENDED.value):
-                ann_list.append(ann)
-        #sort ann_list by date desc
-        # ann_list.sort(key=lambda x: x.get('date', datetime.datetime.min), reverse=True)
-        return gen_looked(ann_list)
+        ann_list, next_cursor = lookup_messages(
+            after=cursor,
+            page_size=LOOKUP_PAGE_SIZE,
+            date_from=date_from or None,
+            date_to=date_to or None,
+            site=site or None,
+            department=department or None,
+            sended=None if filters['sended'] == '' else filters['sended'] == '1')
+        next_query = {**filters, 'cursor': next_cursor} if next_cursor else None
+        if cursor:
+            return gen_looked(ann_list, next_query, rows_only=True)
+        return gen_looked(ann_list, next_query, filters=filters, departments=get_department_names(),
+                          sites=_site_names())
     except Exception as e:
         logger.error(f"Database lookup failed: {e}")
         return "<div>Error accessing the database.</div>"
-    finally:
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import logging
-from src.htmx_gen import gen_result_table, polling_wrapper, no_polling_wrapper
+from src.htmx_gen import gen_result_table, polling_wrapper, no_polling_wrapper, gen_llm_metrics_summary
+from src.classifier.LLM import llm_metrics
 from src.string_management import TasksKey, TaskStatus
 
 logger = logging.getLogger(__name__)
@@ -16,10 +17,12 @@ def step3_result(task_id,tasks):
         return "<p>Task status is unknown.</p>"
     elif status == TaskStatus.STEP3_PROCESSING:
         loading_str = _loaging(tasks[task_id])
-        rt = loading_str + gen_result_table(polling_wrapper, task_id, tasks[task_id].get(TasksKey.ANNOUNCEMENTS.value, []))
+        metrics_str = gen_llm_metrics_summary(llm_metrics.get_task_metrics(task_id))
+        rt = loading_str + metrics_str + gen_result_table(polling_wrapper, task_id, tasks[task_id].get(TasksKey.ANNOUNCEMENTS.value, []))
         return rt
     elif status == TaskStatus.STEP3_COMPLETED:
-        rt = gen_result_table(no_polling_wrapper, task_id, tasks[task_id].get(TasksKey.ANNOUNCEMENTS.value, []))
+        metrics_str = gen_llm_metrics_summary(llm_metrics.get_task_metrics(task_id))
+        rt = metrics_str + gen_result_table(no_polling_wrapper, task_id, tasks[task_id].get(TasksKey.ANNOUNCEMENTS.value, []))
         return rt
     else:
         logger.error(f"Task {task_id} is in an unexpected status: {status}")
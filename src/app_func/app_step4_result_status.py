@@ -1,5 +1,4 @@
-from src.db_scripts.message_manager import get_data_by_title
-from src.db_scripts.task_manager import get_task_status
+from src.db_scripts.message_manager import get_data_by_keys
 from src.htmx_gen import gen_datatable
 from src.string_management import TasksKey, AnnKey, TaskStatus
 def step4_result_status(tasks_id,tasks) ->str:
@@ -16,12 +15,9 @@ def step4_result_status(tasks_id,tasks) ->str:
     if not anns:
         return "<div class='error' style='text-align: center; margin-top: 20px;'>No announcements selected. Please go back to Step 2.</div>"
 
-    anns_in_db = []
-    for ann in anns:
-        db_ann = get_data_by_title(ann[AnnKey.TITLE.value])
-        if db_ann and db_ann.get('task_id'):
-            db_ann['task_status'] = get_task_status(db_ann['task_id'])
-        anns_in_db.append(db_ann)
+    # One query for every selected announcement, task status included
+    db_anns = get_data_by_keys([ann[AnnKey.TITLE.value] for ann in anns], by='title')
+    anns_in_db = [dict(db_anns.get(ann[AnnKey.TITLE.value], {})) for ann in anns]
 
     for ann in anns:
         ann[AnnKey.LOOKED.value] = ann.get(AnnKey.SELECTED.value, False)
@@ -14,17 +14,33 @@ logger = logging.getLogger(__name__)
 from src.app_func.app_step1_init import _get_all_crawlers
 import src.classifier.rule_based_classifier as rule_cls
 import src.classifier.llm_based_classifier as llm_cls
-from src.string_management import TasksKey, AnnKey, TaskStatus
+import src.classifier.cascade_classifier as cascade_cls
+from src.classifier.LLM import llm_metrics
+from src.utils.text_cache import save_extracted_text
+from src.utils.near_duplicate import DEDUP_ENABLED, cluster_announcements
+from src.utils.boilerplate import strip_boilerplate, save_profiles
+from src.string_management import TasksKey, AnnKey, AnnStage, TaskStatus
 
 config = configparser.ConfigParser()
 config.read('config.ini')
 output_base_path = config.get('Outputdir', 'OUTPUT_PATH', fallback='./output')
 
 llm_enabled = config.getint('LLM', 'llm_classifier', fallback=0) == 1
-if llm_enabled:
+cascade_enabled = llm_enabled and config.getint('LLM', 'cascade_classifier', fallback=0) == 1
+if cascade_enabled:
+    classify_dept = cascade_cls.classify_dept
+    classify_text_detail = cascade_cls.classify_text_detail
+elif llm_enabled:
     classify_dept = llm_cls.classify_dept
+    classify_text_detail = llm_cls.classify_text_detail
 else:
     classify_dept = rule_cls.classify_dept
+    classify_text_detail = rule_cls.classify_text_detail
+
+# step 3 pipeline sizing
+pipeline_queue_size = config.getint('Pipeline', 'queue_size', fallback=16)
+extract_worker_count = config.getint('Pipeline', 'extract_workers', fallback=2)
+classify_worker_count = config.getint('Pipeline', 'classify_workers', fallback=8)
 
 def sanitize_filename(filename: str) -> str:
     """Remove invalid characters for Windows filenames."""
@@ -63,11 +79,20 @@ async def run_crawlers_step1(task: dict):
         await browser.close()
 
     logger.info(f"Total announcements found: {len(task[TasksKey.ANNOUNCEMENTS.value])}")
+    # Same regulation published by several sites: parse and classify it once
+    if DEDUP_ENABLED:
+        cluster_announcements(task[TasksKey.ANNOUNCEMENTS.value])
     # Filter by target date
     task[TasksKey.STATUS.value] = TaskStatus.SELECTING
     return
 
 async def announcement_crawler_process(tasks_id: str,tasks: dict):
+    """Step 3 as a streaming pipeline: parse -> extract -> classify.
+
+    Each announcement flows through the stages independently over bounded
+    queues, so classification starts as soon as the first page is parsed.
+    Parsing stays sequential per site (one worker per crawler).
+    """
     if tasks_id not in tasks:
         raise ValueError("Invalid task ID")
     # Create output directory
@@ -75,74 +100,157 @@ async def announcement_crawler_process(tasks_id: str,tasks: dict):
     os.makedirs(output_dir, exist_ok=True)
     filtered_announcements = tasks[tasks_id][TasksKey.ANNOUNCEMENTS.value]
 
-    step2_tasks = []
-    
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        
-        # Set browser context for all crawlers
-        active_crawlers = set()
-        crawler_semaphores = {}
-        for ann in filtered_announcements:
-            crawler = ann.get(AnnKey.CRAWLER.value)
-            if crawler and crawler not in active_crawlers:
-                crawler.browser = context
-                active_crawlers.add(crawler)
-                crawler_semaphores[crawler] = asyncio.Semaphore(1)
+    # Group selected announcements by crawler, keeping their index for file names.
+    # Duplicates of a selected representative are parsed too, but wait for its classification.
+    crawler_items = {}
+    followers = {}
+    for idx, ann in enumerate(filtered_announcements):
+        if ann.get(AnnKey.SELECTED.value) is False:
+            continue
+        ann[AnnKey.STAGE.value] = AnnStage.QUEUED
+        crawler_items.setdefault(ann.get(AnnKey.CRAWLER.value), []).append((idx, ann))
+        rep_idx = ann.get(AnnKey.DUPLICATE_OF.value)
+        if rep_idx is not None and filtered_announcements[rep_idx].get(AnnKey.SELECTED.value) is not False:
+            followers[id(ann)] = filtered_announcements[rep_idx]
 
-        try:
-            # Process announcements concurrently
-            # Note: _single_announcement_crawler_process needs to be async now
-            # and we need to gather its results
-            
-            # Since _single_announcement_crawler_process was doing both crawling AND scheduling classification tasks,
-            # we need to split or adapt it. 
-            # Let's make _single_announcement_crawler_process async and return the classification task if any.
-            
-            process_tasks = []
-            for idx, ann in enumerate(filtered_announcements):
-                crawler = ann.get(AnnKey.CRAWLER.value)
-                semaphore = crawler_semaphores.get(crawler)
-                process_tasks.append(_single_announcement_crawler_process(idx, ann, output_dir, semaphore))
-            
-            results = await asyncio.gather(*process_tasks)
-            
-            # Collect classification tasks from results
-            for res in results:
-                if res:
-                    step2_tasks.append(res)
+    deferred = []
+    await _run_pipeline(crawler_items, output_dir, tasks_id, followers, deferred)
 
-        finally:
-            # Cleanup
-            for crawler in active_crawlers:
-                crawler.browser = None
-            await browser.close()
+    # Followers reuse their representative's departments; if it failed, they are classified on their own
+    retry_items = []
+    for inputs, ann in deferred:
+        rep = followers[id(ann)]
+        if rep.get(AnnKey.STAGE.value) == AnnStage.DONE:
+            _copy_duplicate_result(rep, ann)
+        else:
+            ann[AnnKey.STAGE.value] = AnnStage.CLASSIFYING
+            retry_items.append((inputs, ann))
+    if retry_items:
+        await _classify_all(retry_items, tasks_id)
+    await asyncio.to_thread(save_profiles)
 
-    # Run classification tasks
-    if step2_tasks:
-        await asyncio.gather(*step2_tasks)
-        
     tasks[tasks_id][TasksKey.STATUS.value] = TaskStatus.STEP3_COMPLETED
-    logger.info(f"Crawler completed. Processed {len(filtered_announcements)} announcements.")
+    logger.info(f"Crawler completed. Processed {len(filtered_announcements)} announcements "
+                f"({len(deferred) - len(retry_items)} classifications reused from duplicates).")
+
+async def _run_pipeline(crawler_items: dict, output_dir: str, tasks_id: str,
+                        followers: dict, deferred: list):
+    """Run parse -> extract -> classify over {crawler: [(idx, ann), ...]}.
+
+    Announcements whose id() is in followers stop after extraction; their
+    (inputs, ann) are appended to deferred instead of being classified.
+    """
+    extract_queue = asyncio.Queue(maxsize=pipeline_queue_size)
+    classify_queue = asyncio.Queue(maxsize=pipeline_queue_size)
+    extract_workers = [asyncio.create_task(_extract_worker(extract_queue, classify_queue, followers, deferred))
+                       for _ in range(extract_worker_count)]
+    classify_workers = [asyncio.create_task(_classify_worker(classify_queue, tasks_id)) for _ in range(classify_worker_count)]
+
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context()
+
+            # Set browser context for all crawlers
+            active_crawlers = [crawler for crawler in crawler_items if crawler]
+            for crawler in active_crawlers:
+                crawler.browser = context
+
+            try:
+                await asyncio.gather(*[
+                    _parse_worker(items, output_dir, extract_queue)
+                    for items in crawler_items.values()
+                ])
+            finally:
+                # Cleanup, parsing is the only stage that needs the browser
+                for crawler in active_crawlers:
+                    crawler.browser = None
+                await browser.close()
+    finally:
+        # Drain the downstream stages, one sentinel per worker
+        for _ in extract_workers:
+            await extract_queue.put(None)
+        await asyncio.gather(*extract_workers)
+        for _ in classify_workers:
+            await classify_queue.put(None)
+        await asyncio.gather(*classify_workers)
+
+async def _classify_all(items: list, tasks_id: str):
+    """Classify [(inputs, ann), ...] with the usual number of classify workers."""
+    classify_queue = asyncio.Queue()
+    for item in items:
+        classify_queue.put_nowait(item)
+    workers = [asyncio.create_task(_classify_worker(classify_queue, tasks_id)) for _ in range(classify_worker_count)]
+    for _ in workers:
+        classify_queue.put_nowait(None)
+    await asyncio.gather(*workers)
+
+def _copy_duplicate_result(rep: dict, ann: dict):
+    """Give a duplicate its representative's departments; its own content and attachments stay."""
+    for key in (AnnKey.DEPARTMENTS, AnnKey.UNKNOWN_DEPARTMENTS):
+        value = rep.get(key.value)
+        ann[key.value] = list(value) if isinstance(value, list) else value
+    ann[AnnKey.STAGE.value] = AnnStage.DONE
+
+async def _parse_worker(items, output_dir, extract_queue: asyncio.Queue):
+    """Parse one site's announcements in order and hand each one downstream."""
+    for idx, ann in items:
+        inputs = await _single_announcement_crawler_process(idx, ann, output_dir)
+        if inputs is None:
+            ann[AnnKey.STAGE.value] = AnnStage.FAILED
+            continue
+        ann[AnnKey.STAGE.value] = AnnStage.EXTRACTING
+        await extract_queue.put((inputs, ann))
+
+async def _extract_worker(extract_queue: asyncio.Queue, classify_queue: asyncio.Queue,
+                          followers: dict, deferred: list):
+    """Extract appendix text off the event loop (markitdown is blocking)."""
+    while True:
+        item = await extract_queue.get()
+        if item is None:
+            return
+        (title, content, attachment_paths), ann = item
+        # Site navigation/footers/disclaimers are not sent to the classifier
+        site = getattr(ann.get(AnnKey.CRAWLER.value), 'DISPLAY_NAME', '')
+        content = strip_boilerplate(site, content, page_key=ann.get(AnnKey.LINK.value))
+        try:
+            appendix_texts = await asyncio.to_thread(rule_cls.load_all_appendices, attachment_paths)
+        except Exception as e:
+            logger.error(f"Error extracting appendices for {ann.get(AnnKey.TITLE.value)}: {e}")
+            appendix_texts = {}
+        # Keep the extracted text for later re-classification
+        await asyncio.to_thread(save_extracted_text, ann.get(AnnKey.LINK.value), title, content, appendix_texts)
+        if id(ann) in followers:
+            ann[AnnKey.STAGE.value] = AnnStage.DUPLICATE
+            deferred.append(((title, content, appendix_texts), ann))
+            continue
+        ann[AnnKey.STAGE.value] = AnnStage.CLASSIFYING
+        await classify_queue.put(((title, content, appendix_texts), ann))
+
+async def _classify_worker(classify_queue: asyncio.Queue, tasks_id: str):
+    # LLM calls made from this worker are attributed to the task
+    llm_metrics.current_task_id.set(tasks_id)
+    while True:
+        item = await classify_queue.get()
+        if item is None:
+            return
+        inputs, ann = item
+        await _single_classify_dept(inputs, ann)
 
-async def _single_announcement_crawler_process(idx, ann, output_dir, semaphore=None):
+async def _single_announcement_crawler_process(idx, ann, output_dir):
+        """Parse one announcement and save it; returns (title, content, attachment_paths) or None."""
         try:
             # Create attachment folder
             if ann.get(AnnKey.SELECTED.value) is False:
                 return None
+            ann[AnnKey.STAGE.value] = AnnStage.PARSING
             attachment_folder = os.path.join(output_dir, "attachments")
             os.makedirs(attachment_folder, exist_ok=True)
 
             # Parse announcement
             try:
-                # Assuming parse_announcement is now async
                 title_for_filename = sanitize_filename(ann[AnnKey.TITLE.value])
-                if semaphore:
-                    async with semaphore:
-                        result = await ann[AnnKey.CRAWLER.value].parse_announcement(ann[AnnKey.LINK.value], attachment_folder, default_filename=title_for_filename)
-                else:
-                    result = await ann[AnnKey.CRAWLER.value].parse_announcement(ann[AnnKey.LINK.value], attachment_folder, default_filename=title_for_filename)
+                result = await ann[AnnKey.CRAWLER.value].parse_announcement(ann[AnnKey.LINK.value], attachment_folder, default_filename=title_for_filename)
             except Exception as e:
                 logger.error(f"Error parsing announcement {ann.get(AnnKey.TITLE.value)}: {e}")
                 result = {AnnKey.CONTENT.value: 'None', AnnKey.ATTACHMENTS.value: []}
@@ -159,32 +267,31 @@ async def _single_announcement_crawler_process(idx, ann, output_dir, semaphore=N
             # Save to JSON files
             filename = f"{idx+1:08d}.json"
             filepath = os.path.join(output_dir, filename)
-            # Use aiofiles for async file I/O if possible, but standard open is okay for small files in this context
-            # or run in executor. For now, keep it simple as JSON dump is fast.
+            # JSON dump is fast enough to keep on the event loop
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(announcement_data, f, ensure_ascii=False, indent=2)
 
-            # Classify department
             attachment_paths = [os.path.join(attachment_folder, att) for att in result.get(AnnKey.ATTACHMENTS.value, [])]
             
             # Update ann object
             ann[AnnKey.CONTENT.value] = result.get(AnnKey.CONTENT.value)
             ann[AnnKey.ATTACHMENTS.value] = result.get(AnnKey.ATTACHMENTS.value, [])
             
-            # Return the coroutine for classification to be run later
-            return _single_classify_dept((ann.get(AnnKey.TITLE.value), result.get(AnnKey.CONTENT.value), attachment_paths), ann)
+            return (ann.get(AnnKey.TITLE.value), result.get(AnnKey.CONTENT.value), attachment_paths)
             
         except Exception as e:
             logger.error(f"Error processing announcement {ann.get(AnnKey.TITLE.value)}: {e}")
             return None
 async def _single_classify_dept(inputs, ann):
+    """Classify one announcement; inputs is (title, content, {appendix basename: text})."""
     if not inputs:
         return
     try:
-        dept_set = await classify_dept(*inputs)
+        dept_set, unknown_set = await classify_text_detail(*inputs)
+        ann[AnnKey.UNKNOWN_DEPARTMENTS.value] = list(unknown_set)
         ann[AnnKey.DEPARTMENTS.value] = list(dept_set)
+        ann[AnnKey.STAGE.value] = AnnStage.DONE
     except Exception as e:
         ann[AnnKey.DEPARTMENTS.value] = []
+        ann[AnnKey.STAGE.value] = AnnStage.FAILED
         logger.error(f"Error classifying announcement {ann.get(AnnKey.TITLE.value)}: {e}")
-async def _my_gatterer(tasks):
-    return await asyncio.gather(*tasks)
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Adaptive concurrency control for LLM calls.
+
+AdaptiveLimiter grows the number of in-flight calls while latency stays under
+the target (additive increase) and halves it on 429s / timeouts
+(multiplicative decrease). TokenBucket caps the request rate shared by every
+task running in this process.
+"""
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Global request budget (requests per minute) shared across tasks.
+
+    A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int | None = None):
+        """
+        Args:
+            requests_per_minute (float): Sustained request rate. 0 disables the bucket.
+            burst (int, optional): Bucket capacity. Defaults to one second worth of requests (min 1).
+        """
+        self.rate = max(float(requests_per_minute), 0.0) / 60.0
+        self.capacity = float(burst) if burst else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until one request token is available and consume it."""
+        if not self.enabled:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter.
+
+    Use as ``async with limiter.slot(): ...`` and report the outcome of each
+    call with ``on_success(latency)`` or ``on_congestion()``.
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 target_latency: float, decrease_factor: float = 0.5,
+                 bucket: TokenBucket | None = None):
+        """
+        Args:
+            initial (int): Starting concurrency.
+            min_limit (int): Lower bound of concurrency.
+            max_limit (int): Upper bound of concurrency.
+            target_latency (float): Latency (seconds) considered healthy.
+            decrease_factor (float): Multiplier applied on congestion.
+            bucket (TokenBucket, optional): Shared rate budget acquired before each call.
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.bucket = bucket
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def slot(self):
+        return _LimiterSlot(self)
+
+    async def _acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        if self.bucket is not None:
+            await self.bucket.acquire()
+
+    async def _release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float):
+        """Additive increase: about +1 concurrency per window of healthy calls."""
+        if latency > self.target_latency:
+            return
+        if self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_congestion(self):
+        """Multiplicative decrease on 429 / timeout, at most once per target_latency window."""
+        now = time.monotonic()
+        if now - self._last_decrease < self.target_latency:
+            return
+        self._last_decrease = now
+        old = self.current_limit
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        logger.info(f"LLM concurrency decreased {old} -> {self.current_limit}")
+
+
+class _LimiterSlot:
+    def __init__(self, limiter: AdaptiveLimiter):
+        self._limiter = limiter
+
+    async def __aenter__(self):
+        await self._limiter._acquire()
+        return self._limiter
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._limiter._release()
+        return False
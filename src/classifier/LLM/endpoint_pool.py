@@ -0,0 +1,171 @@
+"""
+Pool of LLM endpoints (provider / key / model) with weighted routing and failover.
+
+Endpoints are grouped in tiers. A question goes to the lowest tier first
+(e.g. a cheap model); within a tier an endpoint is picked at random by
+weight among the healthy ones that are under their own requests-per-minute
+cap. Errors, timeouts and 429s put the endpoint in a growing cooldown and the
+next endpoint is tried; an answer that cannot be parsed escalates to the next
+tier. When every endpoint failed the last error is raised, so the caller's
+retry/backoff logic still applies.
+"""
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Callable
+
+from langchain_core.exceptions import OutputParserException
+
+
+class NoEndpointAvailable(Exception):
+    """Every endpoint is cooling down or at its quota; callers treat it like a 429."""
+    status_code = 429
+
+
+class Endpoint:
+    """One model behind one key at one base URL, with its health and rate state."""
+
+    def __init__(self, name: str, chain: Any, tier: int = 0, weight: float = 1.0,
+                 requests_per_minute: float = 0, timeout: float = 60.0):
+        """
+        Args:
+            name (str): Label used in logs and metrics.
+            chain (Runnable): Prompt | chat model, returning the raw AIMessage.
+            tier (int): Fallback order, lower tiers are asked first.
+            weight (float): Share of traffic within its tier.
+            requests_per_minute (float): Own quota; 0 means unlimited.
+            timeout (float): Seconds per attempt.
+        """
+        self.name = name
+        self.chain = chain
+        self.tier = tier
+        self.weight = weight
+        self.requests_per_minute = requests_per_minute
+        self.timeout = timeout
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.parse_failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.latency_ewma = 0.0
+        self._recent = deque()
+
+    def available(self, now: float) -> bool:
+        if now < self.cooldown_until:
+            return False
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        return not self.requests_per_minute or len(self._recent) < self.requests_per_minute
+
+    def to_dict(self) -> dict:
+        now = time.monotonic()
+        return {
+            'tier': self.tier,
+            'weight': self.weight,
+            'calls': self.calls,
+            'failures': self.failures,
+            'rate_limited': self.rate_limited,
+            'parse_failures': self.parse_failures,
+            'healthy': now >= self.cooldown_until,
+            'cooldown_s': round(max(0.0, self.cooldown_until - now), 1),
+            'requests_last_minute': len(self._recent),
+            'latency_ewma': round(self.latency_ewma, 3),
+        }
+
+
+class EndpointPool:
+    """Routes each question to one endpoint, failing over across endpoints and tiers."""
+
+    def __init__(self, endpoints: list[Endpoint], parse: Callable[[str], bool],
+                 is_rate_limited: Callable[[Exception], bool] = lambda e: False,
+                 cooldown_base: float = 5.0, cooldown_max: float = 120.0):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.parse = parse
+        self.is_rate_limited = is_rate_limited
+        self.cooldown_base = cooldown_base
+        self.cooldown_max = cooldown_max
+        self.tiers = sorted({endpoint.tier for endpoint in endpoints})
+        self._lock = threading.Lock()
+
+    def _pick(self, tier: int, tried: set) -> Endpoint | None:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.tier == tier and e.name not in tried and e.available(now)]
+            if not candidates:
+                return None
+            endpoint = random.choices(candidates, weights=[max(e.weight, 0.0) or 1e-6 for e in candidates])[0]
+            endpoint._recent.append(now)
+            endpoint.calls += 1
+            return endpoint
+
+    def _on_success(self, endpoint: Endpoint, latency: float):
+        with self._lock:
+            endpoint.consecutive_failures = 0
+            endpoint.latency_ewma = latency if not endpoint.latency_ewma else 0.8 * endpoint.latency_ewma + 0.2 * latency
+
+    def _on_failure(self, endpoint: Endpoint, rate_limited: bool):
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.rate_limited += int(rate_limited)
+            endpoint.consecutive_failures += 1
+            if len(self.endpoints) == 1:
+                # Nothing to fail over to; the caller's limiter and backoff handle it
+                return
+            cooldown = min(self.cooldown_max, self.cooldown_base * 2 ** (endpoint.consecutive_failures - 1))
+            endpoint.cooldown_until = time.monotonic() + cooldown
+
+    async def ainvoke(self, inputs: dict) -> tuple[bool, int, int, str]:
+        """
+        Ask one question.
+
+        Args:
+            inputs (dict): Prompt variables.
+
+        Returns:
+            tuple: (parsed answer, input tokens, output tokens, endpoint name).
+                Tokens are summed over every attempt.
+
+        Raises:
+            Exception: The last error when no endpoint produced a parsable answer.
+        """
+        input_tokens = output_tokens = 0
+        last_error: Exception | None = None
+        tried: set = set()
+        for tier in self.tiers:
+            while True:
+                endpoint = self._pick(tier, tried)
+                if endpoint is None:
+                    break
+                tried.add(endpoint.name)
+                start = time.monotonic()
+                try:
+                    message = await asyncio.wait_for(endpoint.chain.ainvoke(inputs), timeout=endpoint.timeout)
+                except Exception as e:
+                    # Timeouts, 429s and transport errors: cool down and fail over within the tier
+                    self._on_failure(endpoint, self.is_rate_limited(e))
+                    last_error = e
+                    continue
+                self._on_success(endpoint, time.monotonic() - start)
+                usage = getattr(message, 'usage_metadata', None) or {}
+                input_tokens += usage.get('input_tokens', 0)
+                output_tokens += usage.get('output_tokens', 0)
+                try:
+                    return self.parse(message.content), input_tokens, output_tokens, endpoint.name
+                except OutputParserException as e:
+                    # The endpoint works but the model did not answer clearly: escalate a tier
+                    with self._lock:
+                        endpoint.parse_failures += 1
+                    last_error = e
+                    break
+        if last_error is None:
+            last_error = NoEndpointAvailable("No LLM endpoint available (all cooling down or at their rate limit)")
+        raise last_error
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {endpoint.name: endpoint.to_dict() for endpoint in self.endpoints}
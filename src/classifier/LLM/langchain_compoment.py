@@ -6,6 +6,7 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda
 
 from src.classifier.LLM.boolean_output_parser import BooleanOutputParser
+from src.classifier.LLM.endpoint_pool import Endpoint, EndpointPool
 
 config = configparser.ConfigParser()
 config.read('config.ini', encoding='utf-8')
@@ -16,9 +17,10 @@ llm_config_section = 'GEMINI'
 APIKey = config.get(llm_config_section, 'api_key')
 baseURL = config.get(llm_config_section, 'baseurl')
 model = config.get(llm_config_section, 'model')
-llm = ChatOpenAI(api_key=APIKey, base_url=baseURL, model=model, temperature=0.2)
+# max_retries=0: 429s must reach the limiter's retry loop, not be absorbed by the SDK
+llm = ChatOpenAI(api_key=APIKey, base_url=baseURL, model=model, temperature=0.2, max_retries=0)
 
-predictPrompt = ChatPromptTemplate.from_messages([
+promptTemplate = ChatPromptTemplate.from_messages([
     ("system", """
      You are an expert at analyzing news articles for a financial institution.
      Your task is to determine whether a new announcement contains information that is 
@@ -34,4 +36,56 @@ predictPrompt = ChatPromptTemplate.from_messages([
       otherwise answer "False".
       Think carefully and provide your answer.
 """)
-     ])| llm | BooleanOutputParser(true_val="True", false_val="False")
\ No newline at end of file
+     ])
+booleanParser = BooleanOutputParser(true_val="True", false_val="False")
+# predictMessage keeps the raw AIMessage so token usage can be recorded before parsing
+predictMessage = promptTemplate | llm
+predictPrompt = predictMessage | booleanParser
+
+
+# Extra endpoints: one [LLM_ENDPOINT:<name>] section each, with the same keys as
+# [GEMINI] plus tier (fallback order, lower first), weight and requests_per_minute.
+# Without such sections the pool holds the single [GEMINI] endpoint.
+ENDPOINT_SECTION_PREFIX = 'LLM_ENDPOINT:'
+DEFAULT_TIMEOUT = config.getfloat(llm_config_section, 'request_timeout', fallback=60.0)
+
+
+def _is_rate_limited(e: Exception) -> bool:
+    status_code = getattr(e, 'status_code', None) or getattr(getattr(e, 'response', None), 'status_code', None)
+    return status_code == 429 or '429' in str(e)
+
+
+def _endpoint_from_section(name: str, section) -> Endpoint:
+    # No SDK retries: a 429 must reach the pool at once so it can cool the endpoint and fail over
+    chat = ChatOpenAI(api_key=section.get('api_key'), base_url=section.get('baseurl'),
+                      model=section.get('model'), temperature=section.getfloat('temperature', fallback=0.2),
+                      max_retries=0)
+    return Endpoint(name, promptTemplate | chat,
+                    tier=section.getint('tier', fallback=0),
+                    weight=section.getfloat('weight', fallback=1.0),
+                    requests_per_minute=section.getfloat('requests_per_minute', fallback=0),
+                    timeout=section.getfloat('request_timeout', fallback=DEFAULT_TIMEOUT))
+
+
+def _build_pool(endpoints: list[Endpoint]) -> EndpointPool:
+    return EndpointPool(endpoints, booleanParser.parse, is_rate_limited=_is_rate_limited,
+                        cooldown_base=config.getfloat(llm_config_section, 'endpoint_cooldown', fallback=5.0),
+                        cooldown_max=config.getfloat(llm_config_section, 'endpoint_cooldown_max', fallback=120.0))
+
+
+_extra_sections = [s for s in config.sections() if s.startswith(ENDPOINT_SECTION_PREFIX)]
+if _extra_sections:
+    endpoint_pool = _build_pool([_endpoint_from_section(s[len(ENDPOINT_SECTION_PREFIX):], config[s])
+                                 for s in _extra_sections])
+else:
+    endpoint_pool = _build_pool([Endpoint(llm_config_section.lower(), predictMessage, timeout=DEFAULT_TIMEOUT)])
+
+
+def configure_llm(api_key: str = None, base_url: str = None, model_name: str = None):
+    """Rebuild the chains and the endpoint pool against one endpoint (e.g. the local mock server for load tests)."""
+    global llm, predictMessage, predictPrompt, endpoint_pool
+    llm = ChatOpenAI(api_key=api_key or APIKey, base_url=base_url or baseURL,
+                     model=model_name or model, temperature=0.2, max_retries=0)
+    predictMessage = promptTemplate | llm
+    predictPrompt = predictMessage | booleanParser
+    endpoint_pool = _build_pool([Endpoint(model_name or model, predictMessage, timeout=DEFAULT_TIMEOUT)])
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""
+LLM call instrumentation.
+
+Every department question sent to the LLM is recorded with its latency,
+input/output tokens, retries, 429s and outcome, and aggregated per task,
+per department and globally. The task id is taken from the
+``current_task_id`` context variable set by the step 3 pipeline.
+"""
+import time
+import threading
+import configparser
+import contextvars
+from collections import deque
+
+config = configparser.ConfigParser()
+config.read('config.ini', encoding='utf-8')
+
+# USD per 1M tokens, used for cost estimates only
+INPUT_COST_PER_1M = config.getfloat('GEMINI', 'input_cost_per_1m', fallback=0.0)
+OUTPUT_COST_PER_1M = config.getfloat('GEMINI', 'output_cost_per_1m', fallback=0.0)
+_LATENCY_SAMPLES = 1000
+
+current_task_id = contextvars.ContextVar('llm_current_task_id', default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token count without a tokenizer: one per CJK character, one per 4 other characters."""
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if '\u3000' <= ch <= '\u9fff' or '\uff00' <= ch <= '\uffef')
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class CallAggregate:
+    """Counters for a group of LLM calls (a task, a department, or everything)."""
+
+    def __init__(self):
+        self.calls = 0
+        self.ok = 0
+        self.failed = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_latency = 0.0
+        self.latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self.first_call = None
+        self.last_call = None
+
+    def add(self, latency: float, input_tokens: int, output_tokens: int,
+            retries: int, rate_limited: int, timeouts: int, ok: bool):
+        now = time.time()
+        self.first_call = self.first_call or now
+        self.last_call = now
+        self.calls += 1
+        self.ok += int(ok)
+        self.failed += int(not ok)
+        self.retries += retries
+        self.rate_limited += rate_limited
+        self.timeouts += timeouts
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.total_latency += latency
+        self.latencies.append(latency)
+
+    @property
+    def cost(self) -> float:
+        return (self.input_tokens * INPUT_COST_PER_1M + self.output_tokens * OUTPUT_COST_PER_1M) / 1_000_000
+
+    def _percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'ok': self.ok,
+            'failed': self.failed,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'timeouts': self.timeouts,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'cost': round(self.cost, 6),
+            'latency_avg': self.total_latency / self.calls if self.calls else 0.0,
+            'latency_p50': self._percentile(0.50),
+            'latency_p95': self._percentile(0.95),
+            'latency_p99': self._percentile(0.99),
+        }
+
+
+_lock = threading.Lock()
+_global = CallAggregate()
+_by_task: dict[str, CallAggregate] = {}
+_by_department: dict[str, CallAggregate] = {}
+_by_task_department: dict[tuple, CallAggregate] = {}
+
+
+def record_call(department: str, latency: float, input_tokens: int = 0, output_tokens: int = 0,
+                retries: int = 0, rate_limited: int = 0, timeouts: int = 0, ok: bool = True,
+                task_id: str | None = None):
+    """
+    Record one department question (including its retries).
+
+    Args:
+        department (str): Department asked about.
+        latency (float): Wall time of all attempts, in seconds.
+        input_tokens (int): Prompt tokens reported by the provider.
+        output_tokens (int): Completion tokens reported by the provider.
+        retries (int): Attempts after the first one.
+        rate_limited (int): Number of 429 responses.
+        timeouts (int): Number of timed out attempts.
+        ok (bool): False when the call ended as "unknown".
+        task_id (str, optional): Defaults to the current_task_id context variable.
+    """
+    task_id = task_id or current_task_id.get()
+    args = (latency, input_tokens, output_tokens, retries, rate_limited, timeouts, ok)
+    with _lock:
+        _global.add(*args)
+        _by_department.setdefault(department, CallAggregate()).add(*args)
+        if task_id:
+            _by_task.setdefault(task_id, CallAggregate()).add(*args)
+            _by_task_department.setdefault((task_id, department), CallAggregate()).add(*args)
+
+
+def get_task_metrics(task_id: str) -> dict:
+    """Aggregate and per-department metrics of one task (empty dict if no call yet)."""
+    with _lock:
+        if task_id not in _by_task:
+            return {}
+        return {
+            'total': _by_task[task_id].to_dict(),
+            'departments': {dept: agg.to_dict() for (tid, dept), agg in _by_task_department.items() if tid == task_id},
+        }
+
+
+def snapshot() -> dict:
+    """All metrics, for the metrics endpoint."""
+    with _lock:
+        return {
+            'total': _global.to_dict(),
+            'tasks': {tid: agg.to_dict() for tid, agg in _by_task.items()},
+            'departments': {dept: agg.to_dict() for dept, agg in _by_department.items()},
+        }
+
+
+def drop_task(task_id: str):
+    """Forget a finished task's metrics (global and department totals are kept)."""
+    with _lock:
+        _by_task.pop(task_id, None)
+        for key in [k for k in _by_task_department if k[0] == task_id]:
+            del _by_task_department[key]
+
+
+def reset():
+    """Clear every counter (used by benchmarks and load tests)."""
+    global _global
+    with _lock:
+        _global = CallAggregate()
+        _by_task.clear()
+        _by_department.clear()
+        _by_task_department.clear()
@@ -0,0 +1,112 @@
+"""
+Token-budgeted packing of an announcement into LLM prompt text.
+
+The first chunk always holds the title and content (content truncated only
+when it alone exceeds the budget), then the head of every appendix, sharing
+what is left of the budget fairly so one huge gazette PDF cannot crowd out the
+others. The unused tail of the appendices can optionally be cut into further
+chunks of the same budget for a map step (see llm_based_classifier).
+"""
+import configparser
+
+from src.classifier.LLM.llm_metrics import estimate_tokens
+
+config = configparser.ConfigParser()
+config.read('config.ini', encoding='utf-8')
+
+# Announcement text per LLM call (the department description comes on top)
+MAX_PROMPT_TOKENS = config.getint('LLM', 'max_prompt_tokens', fallback=12000)
+# Chunks per announcement; 1 = appendix tails are dropped, no map step
+MAX_CHUNKS = config.getint('LLM', 'max_chunks', fallback=1)
+# Budget kept for appendices when the content itself is very long
+APPENDIX_RESERVE_RATIO = config.getfloat('LLM', 'appendix_reserve_ratio', fallback=0.25)
+
+
+def _is_cjk(ch: str) -> bool:
+    return '\u3000' <= ch <= '\u9fff' or '\uff00' <= ch <= '\uffef'
+
+
+def split_at_tokens(text: str, budget: int) -> tuple[str, str]:
+    '''split text after roughly budget tokens (same estimate as estimate_tokens)
+    return: (head, rest)
+    '''
+    if budget <= 0:
+        return '', text or ''
+    if not text or estimate_tokens(text) <= budget:
+        return text or '', ''
+    used = 0.0
+    for i, ch in enumerate(text):
+        used += 1 if _is_cjk(ch) else 0.25
+        if used > budget:
+            # Prefer to cut at a line break close to the limit
+            cut = text.rfind('\n', max(0, i - 200), i)
+            cut = cut if cut > 0 else i
+            return text[:cut], text[cut:]
+    return text, ''
+
+
+def _fair_shares(sizes: list[int], budget: int) -> list[int]:
+    '''split budget over items of the given sizes, no item getting more than it needs'''
+    shares = [0] * len(sizes)
+    pending = [i for i, size in enumerate(sizes) if size > 0]
+    while pending and budget > 0:
+        share = budget // len(pending)
+        if share == 0:
+            break
+        still_pending = []
+        for i in pending:
+            grant = min(share, sizes[i] - shares[i])
+            shares[i] += grant
+            budget -= grant
+            if shares[i] < sizes[i]:
+                still_pending.append(i)
+        pending = still_pending
+    return shares
+
+
+def pack_chunks(title: str, content: str, appendix_texts: dict,
+                max_tokens: int = MAX_PROMPT_TOKENS, max_chunks: int = MAX_CHUNKS) -> list[str]:
+    '''pack an announcement into at most max_chunks texts of about max_tokens each
+    appendix_texts: dict, {basename: extracted_text}
+
+    return: list of str, the first chunk carries title, content and appendix heads
+    '''
+    title = title or ''
+    content = content or ''
+    header = f"Title: {title}\n"
+    body_budget = max(max_tokens - estimate_tokens(header), 0)
+
+    appendix_sizes = [estimate_tokens(text) for text in appendix_texts.values()]
+    reserve = min(sum(appendix_sizes), int(body_budget * APPENDIX_RESERVE_RATIO))
+    content_head, _ = split_at_tokens(content, body_budget - reserve)
+    first = f"{header}Content: {content_head}\n"
+
+    shares = _fair_shares(appendix_sizes, body_budget - estimate_tokens(content_head))
+    tails = []
+    for (basename, text), share in zip(appendix_texts.items(), shares):
+        head, tail = split_at_tokens(text, share)
+        if head:
+            first += f"\nAppendix ({basename}):\n{head}\n"
+        if tail.strip():
+            tails.append((basename, tail))
+    chunks = [first]
+
+    # Map step input: the appendix tails, in order, under the same budget
+    while tails and len(chunks) < max_chunks:
+        chunk = header
+        remaining = body_budget
+        while tails and remaining > 0:
+            basename, tail = tails[0]
+            head, rest = split_at_tokens(tail, remaining)
+            if not head:
+                break
+            chunk += f"\nAppendix ({basename}, continued):\n{head}\n"
+            remaining -= estimate_tokens(head)
+            if rest.strip():
+                tails[0] = (basename, rest)
+            else:
+                tails.pop(0)
+        if chunk == header:
+            break
+        chunks.append(chunk)
+    return chunks
@@ -1,10 +1,17 @@
 import asyncio
 import configparser
+import hashlib
 import json
 import os
 import random
+import time
+import logging
 import httpx
-from src.classifier.LLM.langchain_compoment import predictPrompt
+from src.classifier.LLM import langchain_compoment
+from src.classifier.LLM import llm_metrics
+from src.classifier.LLM.adaptive_limiter import AdaptiveLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
 
 config = configparser.ConfigParser()
 config.read('config.ini', encoding='utf-8')
@@ -12,41 +19,113 @@ gbl_department_description_dict = {}
 gbl_department_names =  []
 
 # concurrency and retry settings (configurable via config.ini under GEMINI section)
-MAX_CONCURRENT = config.getint('GEMINI', 'max_concurrent', fallback=3)
-_semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+# max_concurrent is the ceiling of the adaptive limiter; concurrency starts at
+# initial_concurrent and is adjusted from observed latency / 429s (AIMD).
+MAX_CONCURRENT = config.getint('GEMINI', 'max_concurrent', fallback=16)
+_limiter = AdaptiveLimiter(
+    initial=config.getint('GEMINI', 'initial_concurrent', fallback=3),
+    min_limit=config.getint('GEMINI', 'min_concurrent', fallback=1),
+    max_limit=MAX_CONCURRENT,
+    target_latency=config.getfloat('GEMINI', 'target_latency', fallback=10.0),
+    bucket=TokenBucket(config.getfloat('GEMINI', 'requests_per_minute', fallback=0)),
+)
+
+# single-flight: identical (ann_text, description) questions in flight share one call
+_inflight: dict[str, asyncio.Task] = {}
+_coalesced_calls = 0
+
+def _is_rate_limited(e: Exception) -> bool:
+    status_code = None
+    if hasattr(e, 'response') and getattr(e.response, 'status_code', None):
+        status_code = e.response.status_code
+    # httpx specific
+    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
+        status_code = e.response.status_code
+    if getattr(e, 'status_code', None):
+        status_code = e.status_code
+    return status_code == 429 or '429' in str(e)
+
+async def _predict(ann_text: str, department_description: str) -> tuple[bool, int, int]:
+    """One question through the endpoint pool; returns (parsed answer, input tokens, output tokens).
+
+    The pool bounds each attempt by its endpoint's request_timeout and fails
+    over to other endpoints / tiers before giving up.
+    """
+    result, input_tokens, output_tokens, _ = await langchain_compoment.endpoint_pool.ainvoke(
+        {'ann_text': ann_text, 'department_descriptions': department_description})
+    return result, input_tokens, output_tokens
 
-async def _check_if_this_department(ann_text: str, department_description: str) -> bool:
-    """Call the LLM with limited concurrency and retry on 429 responses.
+async def _check_if_this_department(ann_text: str, department_description: str, department_name: str = '') -> bool | None:
+    """Coalesce concurrent identical questions into one LLM call.
 
-    Returns a boolean-like value (the parsed output) or False on non-retriable errors.
+    Overlapping tasks and duplicate announcements ask the same question at the
+    same time; the first caller starts the call and later callers await its
+    result. The shared call is shielded, so a cancelled caller does not cancel
+    it for the others. Metrics are recorded once, under the first caller's task.
+    """
+    global _coalesced_calls
+    key = hashlib.sha256(f"{department_description}\0{ann_text}".encode('utf-8')).hexdigest()
+    call = _inflight.get(key)
+    if call is None or call.get_loop() is not asyncio.get_running_loop():
+        call = asyncio.ensure_future(_call_llm_for_department(ann_text, department_description, department_name))
+        _inflight[key] = call
+        call.add_done_callback(lambda done, key=key: _inflight.pop(key, None) if _inflight.get(key) is done else None)
+    else:
+        _coalesced_calls += 1
+    return await asyncio.shield(call)
+
+async def _call_llm_for_department(ann_text: str, department_description: str, department_name: str = '') -> bool | None:
+    """Call the LLM through the adaptive limiter and retry on 429 responses / timeouts.
+
+    Returns the parsed boolean, or None ("unknown") when the call failed or
+    retries were exhausted, so the caller can tell a failure from a "False".
+    Every call is recorded in llm_metrics.
     """
     max_retries = config.getint('GEMINI', 'max_retries', fallback=4)
     base_delay = float(config.get('GEMINI', 'base_delay', fallback='1.0'))
+    timeout = config.getfloat('GEMINI', 'request_timeout', fallback=60.0)
 
-    async with _semaphore:
-        for attempt in range(1, max_retries + 1):
+    call_start = time.monotonic()
+    rate_limited = timeouts = 0
+    input_tokens = output_tokens = 0
+    result = None
+    attempt = 1
+    for attempt in range(1, max_retries + 1):
+        congested = False
+        async with _limiter.slot():
+            start = time.monotonic()
             try:
-                resut = await predictPrompt.ainvoke({'ann_text': ann_text, 'department_descriptions': department_description})
-                return resut
+                result, input_tokens, output_tokens = await _predict(ann_text, department_description)
+                _limiter.on_success(time.monotonic() - start)
+                break
+            except asyncio.TimeoutError:
+                _limiter.on_congestion()
+                congested = True
+                timeouts += 1
+                logger.warning(f"LLM call timed out after {timeout}s (attempt {attempt}/{max_retries})")
             except Exception as e:
-                status_code = None
-                if hasattr(e, 'response') and getattr(e.response, 'status_code', None):
-                    status_code = e.response.status_code
-                # httpx specific
-                if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
-                    status_code = e.response.status_code
-
-                # If rate limited (429) -> backoff and retry
-                if status_code == 429 or '429' in str(e):
-                    if attempt == max_retries:
-                        # exhausted retries
-                        return False
-                    # exponential backoff with jitter
-                    delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
-                    await asyncio.sleep(delay)
-                    continue
-                # For other errors, don't retry here — return False so caller can decide
-                return False
+                # If rate limited (429) -> shrink concurrency, backoff and retry
+                if _is_rate_limited(e):
+                    _limiter.on_congestion()
+                    congested = True
+                    rate_limited += 1
+                else:
+                    # For other errors, don't retry here — report unknown so caller can decide
+                    logger.error(f"LLM call failed for {department_name}: {e}")
+                    break
+        if congested and attempt < max_retries:
+            # exponential backoff with jitter, outside the slot so others can proceed
+            delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
+            await asyncio.sleep(delay)
+    else:
+        # exhausted retries
+        logger.warning(f"LLM call for {department_name} gave up after {max_retries} attempts")
+
+    llm_metrics.record_call(department_name, time.monotonic() - call_start,
+                            input_tokens=input_tokens, output_tokens=output_tokens,
+                            retries=attempt - 1, rate_limited=rate_limited, timeouts=timeouts,
+                            ok=result is not None)
+    return result
 
 def _init_describe_data():
     global gbl_department_description_dict
@@ -75,14 +154,41 @@ def _load_department_description(department_name: str,dir_path: str) -> str:
     with open(file_path, mode='r', encoding='utf-8') as f:
         content = f.read()
     return content
-async def read_describe_to_decide_department(ann_text: str) -> dict[str, bool]:
+async def read_describe_to_decide_department(ann_text: str, department_names: list[str] | None = None) -> dict[str, bool | None]:
+    """Ask the LLM about every department (or only department_names when given).
+
+    Returns {department: True/False}, or None for departments whose call failed.
+    """
     global gbl_department_description_dict
     global gbl_department_names
     if len(gbl_department_names) == 0 or len(gbl_department_description_dict) == 0:
         _ = _init_describe_data()
+    if department_names is None:
+        department_names = gbl_department_names
     results = await asyncio.gather(*[
-        _check_if_this_department(ann_text, gbl_department_description_dict.get(department_name, ""))
-        for department_name in gbl_department_names
+        _check_if_this_department(ann_text, gbl_department_description_dict.get(department_name, ""), department_name)
+        for department_name in department_names
     ])
-    # Map department names to boolean results, preserving order
-    return {name: bool(res) for name, res in zip(gbl_department_names, results)}
\ No newline at end of file
+    # Map department names to results, preserving order (None = unknown)
+    return {name: (None if res is None else bool(res)) for name, res in zip(department_names, results)}
+
+def reload_department_description(department_name: str) -> str:
+    """Re-read one department's markdown after it was edited in the knowledge editor."""
+    if len(gbl_department_names) == 0 or len(gbl_department_description_dict) == 0:
+        _ = _init_describe_data()
+    dir_path = config.get('DEPARTMENT', 'department_description')
+    description = _load_department_description(department_name, dir_path)
+    gbl_department_description_dict[department_name] = description
+    return description
+
+def get_limiter_state() -> dict:
+    """Current adaptive limiter state, for the metrics endpoint."""
+    return {'limit': _limiter.current_limit, 'in_flight': _limiter.in_flight,
+            'min': _limiter.min_limit, 'max': _limiter.max_limit,
+            'coalesced': _coalesced_calls, 'distinct_in_flight': len(_inflight)}
+
+def get_department_names() -> list[str]:
+    """Department names known to the LLM classifier (loads descriptions on first use)."""
+    if len(gbl_department_names) == 0 or len(gbl_department_description_dict) == 0:
+        _ = _init_describe_data()
+    return list(gbl_department_names)
@@ -0,0 +1,102 @@
+import logging
+import configparser
+from collections import Counter
+from src.classifier.LLM.read_describe_to_decide_department import get_department_names
+from src.classifier.llm_based_classifier import build_llm_chunks, decide_over_chunks
+from src.classifier.dept_retriever import shortlist_departments
+from src.classifier.rule_based_classifier import load_all_appendices, match_dept_evidence, _post_process_dept_result
+
+logger = logging.getLogger(__name__)
+
+config = configparser.ConfigParser()
+config.read('config.ini', encoding='utf-8')
+
+# 規則命中幾個不同關鍵字即直接採用，不再詢問 LLM
+ACCEPT_HITS = config.getint('LLM', 'cascade_accept_hits', fallback=2)
+# 無任何關鍵字命中時直接略過的部門（逗號分隔，* 代表全部）
+_skip_raw = config.get('LLM', 'cascade_skip_no_signal', fallback='')
+SKIP_NO_SIGNAL_ALL = _skip_raw.strip() == '*'
+SKIP_NO_SIGNAL = {d.strip() for d in _skip_raw.split(',') if d.strip() and d.strip() != '*'}
+
+# Decision counters since start-up: rule_accepted / skipped / llm / unknown
+cascade_stats = Counter()
+
+def get_cascade_stats() -> dict:
+    '''return decision counters, plus the fraction of department questions that reached the LLM'''
+    stats = dict(cascade_stats)
+    total = sum(cascade_stats[k] for k in ('rule_accepted', 'skipped', 'llm'))
+    stats['llm_ratio'] = cascade_stats['llm'] / total if total else 0.0
+    return stats
+
+async def classify_dept(title: str, content: str, appendix_paths: list[str]) -> set:
+    '''classify announcement to department set, rules first and LLM for the rest
+    title: str
+    content: str
+    appendix: list of str, paths to appendix files
+    '''
+    result_set, _ = await classify_dept_detail(title, content, appendix_paths)
+    return result_set
+
+async def classify_dept_detail(title: str, content: str, appendix_paths: list[str]) -> tuple[set, set]:
+    '''classify announcement through the rule -> LLM cascade
+    title: str
+    content: str
+    appendix: list of str, paths to appendix files
+
+    return: (set of relevant departments, set of departments whose LLM call failed)
+    '''
+    return await classify_text_detail(title, content, load_all_appendices(appendix_paths))
+
+async def classify_text_detail(title: str, content: str, appendix_texts: dict) -> tuple[set, set]:
+    '''classify announcement whose appendices are already extracted
+    appendix_texts: dict, {basename: extracted_text}
+
+    return: (set of relevant departments, set of departments whose LLM call failed)
+    '''
+    decisions = await cascade_decide(title, content or '', appendix_texts)
+    result_set = {dept for dept, (relevant, _) in decisions.items() if relevant is True}
+    unknown_set = {dept for dept, (relevant, _) in decisions.items() if relevant is None}
+    return _post_process_dept_result(result_set), unknown_set
+
+async def cascade_decide(title: str, content: str, appendix_texts: dict) -> dict[str, tuple]:
+    '''decide every department, returning where each decision came from
+    appendix_texts: dict, {basename: extracted_text}
+
+    return: dict, {department: (True/False/None, 'rule' | 'skip' | 'llm')}
+    '''
+    appendix_text = '\n'.join([f"{basename}:\n{text}" for basename, text in appendix_texts.items()])
+    evidence = match_dept_evidence(f"{title}\n{content}\n{appendix_text}")
+
+    decisions = {}
+    ambiguous = []
+    for dept, keywords in evidence.items():
+        if len(keywords) >= ACCEPT_HITS:
+            decisions[dept] = (True, 'rule')
+    for dept in get_department_names():
+        if dept in decisions:
+            continue
+        if dept not in evidence and (SKIP_NO_SIGNAL_ALL or dept in SKIP_NO_SIGNAL):
+            decisions[dept] = (False, 'skip')
+        else:
+            ambiguous.append(dept)
+
+    chunks = build_llm_chunks(title, content, appendix_texts)
+    candidates = shortlist_departments('\n'.join(chunks))
+    if candidates is not None:
+        # Departments outside the local shortlist are not asked
+        for dept in [d for d in ambiguous if d not in candidates]:
+            decisions[dept] = (False, 'skip')
+        ambiguous = [d for d in ambiguous if d in candidates]
+
+    if ambiguous:
+        llm_results = await decide_over_chunks(chunks, department_names=ambiguous)
+        for dept, relevant in llm_results.items():
+            decisions[dept] = (relevant, 'llm')
+
+    sources = Counter(source for _, source in decisions.values())
+    cascade_stats['rule_accepted'] += sources['rule']
+    cascade_stats['skipped'] += sources['skip']
+    cascade_stats['llm'] += sources['llm']
+    cascade_stats['unknown'] += sum(1 for relevant, _ in decisions.values() if relevant is None)
+    logger.info(f"Cascade for '{title}': rule={sources['rule']} skip={sources['skip']} llm={sources['llm']}")
+    return decisions
@@ -0,0 +1,187 @@
+"""
+Local department shortlist before LLM calls.
+
+Indexes the department markdown files under Dept_description with BM25 (or an
+optional local sentence-transformers model) and scores an announcement
+against every department, so only the top-k candidates (plus departments that
+must always be asked) are sent to the LLM. Runs fully offline.
+
+Recall against approved history:
+    python -m src.classifier.dept_retriever [k ...]
+"""
+import os
+import re
+import sys
+import math
+import logging
+import configparser
+from collections import Counter
+from src.classifier.text_normalizer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+config = configparser.ConfigParser()
+config.read('config.ini', encoding='utf-8')
+
+SHORTLIST_TOP_K = config.getint('LLM', 'shortlist_top_k', fallback=0)  # 0 = disabled
+SHORTLIST_BACKEND = config.get('LLM', 'shortlist_backend', fallback='bm25')  # bm25 | embedding
+SHORTLIST_ALWAYS_INCLUDE = [d.strip() for d in config.get('LLM', 'shortlist_always_include', fallback='').split(',') if d.strip()]
+EMBEDDING_MODEL = config.get('LLM', 'shortlist_embedding_model', fallback='')
+
+_token_re = re.compile(r'[\u4e00-\u9fff]+|[A-Za-z0-9]+')
+
+def tokenize(text: str) -> list[str]:
+    '''CJK runs become character bigrams, latin/digit runs become lower-cased words'''
+    tokens = []
+    for run in _token_re.findall(normalize_text(text, strip_whitespace=False)):
+        if run.isascii():
+            tokens.append(run.lower())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over one document per department."""
+
+    def __init__(self, docs: dict[str, str], k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            docs (dict): {department: description text}
+        """
+        self.k1 = k1
+        self.b = b
+        self.names = list(docs.keys())
+        self._tfs = [Counter(tokenize(docs[name])) for name in self.names]
+        self._lens = [sum(tf.values()) for tf in self._tfs]
+        self._avg_len = (sum(self._lens) / len(self._lens)) if self._lens else 0.0
+        df = Counter()
+        for tf in self._tfs:
+            df.update(tf.keys())
+        n = len(self.names)
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def score(self, text: str) -> dict[str, float]:
+        query = Counter(tokenize(text))
+        scores = {}
+        for name, tf, length in zip(self.names, self._tfs, self._lens):
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_len) if self._avg_len else self.k1
+            s = 0.0
+            for term, qf in query.items():
+                f = tf.get(term)
+                if f:
+                    s += self._idf[term] * f * (self.k1 + 1) / (f + norm) * qf
+            scores[name] = s
+        return scores
+
+
+class EmbeddingIndex:
+    """Cosine similarity with a local sentence-transformers model (optional dependency)."""
+
+    def __init__(self, docs: dict[str, str], model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.names = list(docs.keys())
+        self._model = SentenceTransformer(model_name, device='cpu', local_files_only=True)
+        self._doc_vecs = self._model.encode([docs[n] for n in self.names], normalize_embeddings=True)
+
+    def score(self, text: str) -> dict[str, float]:
+        vec = self._model.encode([text], normalize_embeddings=True)[0]
+        return {name: float(doc_vec @ vec) for name, doc_vec in zip(self.names, self._doc_vecs)}
+
+
+_index = None
+_index_signature = None
+
+def _load_docs() -> dict[str, str]:
+    from src.classifier.LLM.read_describe_to_decide_department import get_department_names
+    dir_path = config.get('DEPARTMENT', 'department_description')
+    docs = {}
+    for name in get_department_names():
+        path = os.path.join(dir_path, f"{name}.md")
+        try:
+            with open(path, mode='r', encoding='utf-8') as f:
+                docs[name] = f.read()
+        except OSError as e:
+            logger.warning(f"Cannot read department description {path}: {e}")
+            docs[name] = name
+    return docs
+
+def _docs_signature() -> tuple:
+    dir_path = config.get('DEPARTMENT', 'department_description')
+    try:
+        return tuple(sorted((e.name, e.stat().st_mtime) for e in os.scandir(dir_path) if e.name.endswith('.md')))
+    except OSError:
+        return ()
+
+def get_index():
+    '''return the department index, rebuilt when a description file changes'''
+    global _index, _index_signature
+    signature = _docs_signature()
+    if _index is None or signature != _index_signature:
+        docs = _load_docs()
+        if SHORTLIST_BACKEND == 'embedding' and EMBEDDING_MODEL:
+            try:
+                _index = EmbeddingIndex(docs, EMBEDDING_MODEL)
+            except Exception as e:
+                logger.warning(f"Embedding shortlist unavailable ({e}), falling back to BM25")
+                _index = BM25Index(docs)
+        else:
+            _index = BM25Index(docs)
+        _index_signature = signature
+    return _index
+
+def shortlist_departments(ann_text: str, top_k: int = SHORTLIST_TOP_K,
+                          always_include: list[str] = SHORTLIST_ALWAYS_INCLUDE) -> list[str] | None:
+    '''return candidate departments for the LLM, or None when shortlisting is disabled
+    ann_text: str
+    top_k: int, number of best-scoring departments to keep
+    always_include: list of str, departments always kept
+
+    return: list of department names in index order
+    '''
+    if top_k <= 0:
+        return None
+    index = get_index()
+    scores = index.score(ann_text)
+    ranked = sorted(index.names, key=lambda n: scores[n], reverse=True)
+    keep = set(ranked[:top_k]) | (set(always_include) & set(index.names))
+    return [name for name in index.names if name in keep]
+
+def evaluate_recall(samples: list[tuple[str, set]], top_k: int,
+                    always_include: list[str] = SHORTLIST_ALWAYS_INCLUDE) -> dict:
+    '''measure how many approved departments survive the shortlist
+    samples: list of (announcement text, set of approved departments)
+
+    return: dict with micro recall, fraction of samples fully covered and mean shortlist size
+    '''
+    hit = total = full = size = 0
+    for text, expected in samples:
+        candidates = set(shortlist_departments(text, top_k, always_include) or [])
+        found = len(expected & candidates)
+        hit += found
+        total += len(expected)
+        full += int(found == len(expected))
+        size += len(candidates)
+    n = len(samples)
+    return {
+        'top_k': top_k,
+        'samples': n,
+        'recall': hit / total if total else 1.0,
+        'full_recall_rate': full / n if n else 1.0,
+        'mean_shortlist_size': size / n if n else 0.0,
+    }
+
+def _main(argv: list[str]):
+    from src.db_scripts.message_manager import get_approved_messages
+    samples = []
+    for msg in get_approved_messages():
+        expected = set(msg.get('departments') or []) | set(msg.get('cc_departments') or [])
+        if expected:
+            samples.append((f"{msg.get('title') or ''}\n{msg.get('content') or ''}", expected))
+    for k in [int(a) for a in argv] or [3, 5, 8, 12]:
+        print(evaluate_recall(samples, k))
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
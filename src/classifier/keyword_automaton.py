@@ -0,0 +1,73 @@
+"""
+Aho-Corasick keyword automaton.
+
+Finds every keyword occurring in a text in a single pass, independent of the
+number of keywords, instead of one substring scan per keyword.
+"""
+from collections import deque
+from typing import Iterable, Iterator
+
+
+class KeywordAutomaton:
+    """
+    Multi-keyword matcher built once from a keyword list.
+
+    Overlapping keywords are all reported (e.g. both '證券' and '證券商').
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords (Iterable[str]): Keywords to match. Empty strings are ignored.
+        """
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[str, ...]] = [()]
+        self.keywords: set[str] = set()
+        for keyword in keywords:
+            if keyword:
+                self._add(keyword)
+        self._build()
+
+    def _add(self, keyword: str):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        if keyword not in self._out[state]:
+            self._out[state] = self._out[state] + (keyword,)
+        self.keywords.add(keyword)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[str]:
+        """Yield each keyword occurrence found in text (may repeat)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                yield from out[state]
+
+    def find_all(self, text: str) -> set[str]:
+        """Return the set of distinct keywords found in text."""
+        return set(self.iter_matches(text))
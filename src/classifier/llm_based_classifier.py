@@ -3,31 +3,77 @@ import logging
 from markitdown import MarkItDown
 from src.classifier.LLM.read_describe_to_decide_department import read_describe_to_decide_department
 from src.classifier.rule_based_classifier import load_all_appendices
+from src.classifier.dept_retriever import shortlist_departments
+from src.classifier.LLM.prompt_packer import pack_chunks
 
 logger = logging.getLogger(__name__)
 
+def build_llm_text(title: str, content: str, appendix_texts: dict) -> str:
+    '''combine title, content and appendix heads into the LLM announcement text, within the token budget
+    appendix_texts: dict, {basename: extracted_text}
+    '''
+    return pack_chunks(title, content, appendix_texts, max_chunks=1)[0]
+
+def build_llm_chunks(title: str, content: str, appendix_texts: dict) -> list[str]:
+    '''announcement text cut into token-budgeted chunks ([LLM] max_chunks, first chunk = build_llm_text)'''
+    return pack_chunks(title, content, appendix_texts)
+
+async def decide_over_chunks(chunks: list[str], department_names: list[str] | None = None) -> dict[str, bool | None]:
+    '''ask the LLM chunk by chunk, stopping for a department as soon as one chunk is relevant
+    return: {department: True / False / None (unknown, no chunk said True and some call failed)}
+    '''
+    results = await read_describe_to_decide_department(chunks[0], department_names=department_names)
+    for chunk in chunks[1:]:
+        # Only departments not yet judged relevant read the next chunk
+        pending = [dept for dept, relevant in results.items() if relevant is not True]
+        if not pending:
+            break
+        chunk_results = await read_describe_to_decide_department(chunk, department_names=pending)
+        for dept, relevant in chunk_results.items():
+            if relevant is True or results[dept] is False:
+                results[dept] = relevant
+    return results
+
 async def classify_dept(title: str, content: str, appendix_paths: list[str]) -> set:
     '''classify announcement to department set using LLM
     title: str
     content: str
     appendix: list of str, paths to appendix files
     '''
-    # Combine title and content
-    full_text = f"Title: {title}\nContent: {content}\n"
-    
-    # Process appendices
-    appendix_texts = load_all_appendices(appendix_paths)
-    for basename, text in appendix_texts.items():
-        full_text += f"\nAppendix ({basename}):\n{text}\n"
+    result_set, _ = await classify_dept_detail(title, content, appendix_paths)
+    return result_set
+
+async def classify_dept_detail(title: str, content: str, appendix_paths: list[str]) -> tuple[set, set]:
+    '''classify announcement using LLM, keeping failed calls apart
+    title: str
+    content: str
+    appendix: list of str, paths to appendix files
+
+    return: (set of relevant departments, set of departments whose LLM call failed)
+    '''
+    return await classify_text_detail(title, content, load_all_appendices(appendix_paths))
+
+async def classify_text_detail(title: str, content: str, appendix_texts: dict) -> tuple[set, set]:
+    '''classify announcement whose appendices are already extracted
+    appendix_texts: dict, {basename: extracted_text}
+
+    return: (set of relevant departments, set of departments whose LLM call failed)
+    '''
+    chunks = build_llm_chunks(title, content, appendix_texts)
 
     # Call LLM classifier
     try:
-        classification_results = await read_describe_to_decide_department(full_text)
+        # Only shortlisted departments are asked; the others count as not relevant
+        candidates = shortlist_departments('\n'.join(chunks))
+        classification_results = await decide_over_chunks(chunks, department_names=candidates)
         
-        # Filter departments where result is True
-        result_set = {dept for dept, is_relevant in classification_results.items() if is_relevant}
+        # Filter departments where result is True, None means the call failed
+        result_set = {dept for dept, is_relevant in classification_results.items() if is_relevant is True}
+        unknown_set = {dept for dept, is_relevant in classification_results.items() if is_relevant is None}
+        if unknown_set:
+            logger.warning(f"LLM classification unknown for {sorted(unknown_set)}: {title}")
         
-        return result_set
+        return result_set, unknown_set
     except Exception as e:
         logger.error(f"Error during LLM classification: {e}")
-        return set()
+        return set(), set()
@@ -0,0 +1,139 @@
+"""
+Incremental re-classification of a single department.
+
+After a department's description (knowledge editor) or its keyword rules
+(rule.xlsx) change, only that department's column is recomputed over pending
+or recent messages, using the text cached at extraction time, and the flips
+are written to a diff report. Messages themselves are not modified.
+
+    python -m src.classifier.reclassify 法務部 --source llm --scope pending
+    python -m src.classifier.reclassify 法務部 --source rule --scope recent --days 30
+"""
+import os
+import json
+import asyncio
+import argparse
+import datetime
+import logging
+import configparser
+
+from src.db_scripts.message_manager import get_messages_for_reclassify
+from src.db_scripts.async_db import run_db
+from src.utils.text_cache import load_extracted_text
+
+logger = logging.getLogger(__name__)
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+REPORT_PATH = config.get('Outputdir', 'REPORT_PATH', fallback='./reports')
+
+
+def _message_text(msg: dict) -> tuple[str, str, dict, bool]:
+    '''(title, content, appendix_texts, from_cache) for a stored message'''
+    cached = load_extracted_text(msg.get('link'))
+    if cached:
+        return cached.get('title') or '', cached.get('content') or '', cached.get('appendix_texts') or {}, True
+    return msg.get('title') or '', msg.get('content') or '', {}, False
+
+
+async def _decide_llm(dept: str, texts: list[tuple]) -> list[bool | None]:
+    from src.classifier.llm_based_classifier import build_llm_chunks, decide_over_chunks
+    from src.classifier.LLM.read_describe_to_decide_department import reload_department_description
+    reload_department_description(dept)
+    results = await asyncio.gather(*[
+        decide_over_chunks(build_llm_chunks(title, content, appendix_texts), department_names=[dept])
+        for title, content, appendix_texts, _ in texts
+    ])
+    return [r.get(dept) for r in results]
+
+
+async def _decide_rule(dept: str, texts: list[tuple]) -> list[bool | None]:
+    from src.classifier import rule_based_classifier as rule_cls
+    rule_cls.reload_rules()
+    decisions = []
+    for title, content, appendix_texts, _ in texts:
+        appendix_text = '\n'.join([f"{basename}:\n{text}" for basename, text in appendix_texts.items()])
+        evidence = rule_cls.match_dept_evidence(f"{title}\n{content}\n{appendix_text}")
+        hit = rule_cls._post_process_dept_result(set(evidence))
+        decisions.append(dept in hit)
+    return decisions
+
+
+async def reclassify_department(dept: str, source: str = 'llm', scope: str = 'pending', days: int = 14) -> dict:
+    '''recompute one department over pending/recent messages and write a flip report
+    dept: str, department name
+    source: 'llm' or 'rule'
+    scope: 'pending' or 'recent'
+    days: int, look-back window when scope is 'recent'
+
+    return: dict report (also written to REPORT_PATH)
+    '''
+    # Runs as a FastAPI background task on the event loop: keep the query off it
+    messages = await run_db(get_messages_for_reclassify, scope, days)
+    texts = [_message_text(msg) for msg in messages]
+    decide = _decide_llm if source == 'llm' else _decide_rule
+    decisions = await decide(dept, texts) if messages else []
+
+    flips, unknown = [], []
+    for msg, text, new in zip(messages, texts, decisions):
+        to_list = msg.get('departments') or []
+        cc_list = msg.get('cc_departments') or []
+        old = dept in to_list or dept in cc_list
+        entry = {'id': msg.get('id'), 'task_id': msg.get('task_id'), 'title': msg.get('title'),
+                 'link': msg.get('link'), 'old': 'cc' if dept in cc_list else ('to' if old else 'none'),
+                 'cached_text': text[3]}
+        if new is None:
+            unknown.append(entry)
+        elif new != old:
+            entry['change'] = 'added' if new else 'removed'
+            flips.append(entry)
+
+    report = {
+        'department': dept,
+        'source': source,
+        'scope': scope,
+        'days': days if scope == 'recent' else None,
+        'created_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'messages': len(messages),
+        'cached_texts': sum(1 for t in texts if t[3]),
+        'added': sum(1 for f in flips if f['change'] == 'added'),
+        'removed': sum(1 for f in flips if f['change'] == 'removed'),
+        'flips': flips,
+        'unknown': unknown,
+    }
+    report['path'] = _write_report(report)
+    logger.info(f"Re-classified {dept} over {len(messages)} {scope} messages: "
+                f"+{report['added']} / -{report['removed']}, unknown {len(unknown)}")
+    return report
+
+
+def _write_report(report: dict) -> str:
+    os.makedirs(REPORT_PATH, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(REPORT_PATH, f"reclassify_{report['department']}_{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def latest_report(dept: str) -> dict | None:
+    '''most recent re-classification report of a department, or None'''
+    if not os.path.isdir(REPORT_PATH):
+        return None
+    prefix = f"reclassify_{dept}_"
+    names = sorted(n for n in os.listdir(REPORT_PATH) if n.startswith(prefix) and n.endswith('.json'))
+    if not names:
+        return None
+    with open(os.path.join(REPORT_PATH, names[-1]), encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-classify one department and report flips")
+    parser.add_argument('department')
+    parser.add_argument('--source', choices=['llm', 'rule'], default='llm')
+    parser.add_argument('--scope', choices=['pending', 'recent'], default='pending')
+    parser.add_argument('--days', type=int, default=14)
+    args = parser.parse_args()
+    result = asyncio.run(reclassify_department(args.department, args.source, args.scope, args.days))
+    print(json.dumps({k: v for k, v in result.items() if k not in ('flips', 'unknown')}, ensure_ascii=False, indent=2))
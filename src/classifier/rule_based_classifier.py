@@ -6,6 +6,8 @@ import logging
 from collections import Counter, defaultdict
 from markitdown import MarkItDown
 from src.logging_config import setup_logging
+from src.classifier.keyword_automaton import KeywordAutomaton
+from src.classifier.text_normalizer import normalize_text
 
 # Initialize logging
 setup_logging()
@@ -32,14 +34,39 @@ exclude_depts = {
 # ====================
 
 # 關鍵字對照表
-keyword_dict = pd.read_excel(rule_file, sheet_name="manual_dict")
-keyword_dict = keyword_dict[keyword_dict['Enable'] == 1]  # 只取 Enable=1 的列
-content_keywords = defaultdict(set)
-for _, row in keyword_dict.iterrows():
-    k = row['關鍵字']
-    v = row['相關部門']
-    if pd.notna(k) and pd.notna(v):
-        content_keywords[k].add(v)
+def _load_rules() -> dict:
+    '''read enabled keyword rules from rule.xlsx
+    return: dict, {keyword: set of department}
+    '''
+    keyword_dict = pd.read_excel(rule_file, sheet_name="manual_dict")
+    keyword_dict = keyword_dict[keyword_dict['Enable'] == 1]  # 只取 Enable=1 的列
+    rules = defaultdict(set)
+    for _, row in keyword_dict.iterrows():
+        k = row['關鍵字']
+        v = row['相關部門']
+        if pd.notna(k) and pd.notna(v):
+            rules[k].add(v)
+    return rules
+def _compile_rules(rules: dict) -> tuple[KeywordAutomaton, dict]:
+    '''build the automaton over normalized keywords
+    return: (automaton, {normalized keyword: set of original keywords})
+    '''
+    keyword_forms = defaultdict(set)
+    for keyword in rules:
+        keyword_forms[normalize_text(str(keyword))].add(keyword)
+    return KeywordAutomaton(keyword_forms.keys()), keyword_forms
+content_keywords = _load_rules()
+# 關鍵字自動機（一次掃描找出所有關鍵字；關鍵字與內文皆先正規化）
+keyword_automaton, keyword_forms = _compile_rules(content_keywords)
+
+def reload_rules() -> int:
+    '''re-read rule.xlsx after it was edited; return the number of enabled keywords'''
+    global content_keywords, keyword_automaton, keyword_forms
+    rules = _load_rules()
+    automaton, forms = _compile_rules(rules)
+    content_keywords, keyword_automaton, keyword_forms = rules, automaton, forms
+    logger.info(f"Reloaded {len(rules)} keyword rules from {rule_file}")
+    return len(rules)
 md = MarkItDown(enable_plugins=False)
 
 # 分類內文主旨至對應部門
@@ -52,17 +79,40 @@ async def classify_dept(title: str, content: str, appendix_paths: list[str]) ->
     return: set of department
     '''
     appendix_texts = load_all_appendices(appendix_paths)
+    result_set, _ = await classify_text_detail(title, content, appendix_texts)
+    return result_set
+async def classify_text_detail(title: str, content: str, appendix_texts: dict) -> tuple[set, set]:
+    '''classify announcement whose appendices are already extracted
+    appendix_texts: dict, {basename: extracted_text}
+
+    return: (set of department, empty set -- rules never leave a department unknown)
+    '''
     appendix_text = '\n'.join([f"{basename}:\n{text}" for basename, text in appendix_texts.items()])
-    return await _classify_ann(title, content, appendix_text)
+    return await _classify_ann(title, content, appendix_text), set()
 async def _dept_by_content(text: str) -> set:
     if not isinstance(text, str):
         raise ValueError("Input text must be a string.")
     result = set()
-    for keyword, depts in content_keywords.items():
-        if keyword in text:
-            result.update(depts)
+    for normalized in keyword_automaton.find_all(normalize_text(text)):
+        for keyword in keyword_forms[normalized]:
+            result.update(content_keywords[keyword])
     return result
 
+def match_dept_evidence(text: str) -> dict[str, set]:
+    '''match keyword rules against text
+    text: str
+
+    return: dict, {department: set of matched keywords}
+    '''
+    if not isinstance(text, str):
+        raise ValueError("Input text must be a string.")
+    evidence = defaultdict(set)
+    for normalized in keyword_automaton.find_all(normalize_text(text)):
+        for keyword in keyword_forms[normalized]:
+            for dept in content_keywords[keyword]:
+                evidence[dept].add(keyword)
+    return dict(evidence)
+
 # 根據額外規則補齊部門
 def _post_process_dept_result(dept_set: set) -> set:
     """根據規則補齊部門"""
@@ -128,4 +178,39 @@ def load_all_appendices(file_paths: list) -> dict:
         if text:
             basename = os.path.basename(file_path)
             result[basename] = text
-    return result
\ No newline at end of file
+    return result
+# ====================
+# 批次分類（整個任務或離線回填共用同一個自動機）
+# ====================
+BATCH_SERIAL_THRESHOLD = 64
+
+def _classify_item(item: dict) -> dict:
+    '''classify one batch item with the module-level automaton
+    item: dict with title, content and appendix_texts (dict) or appendix_paths (list)
+    '''
+    appendix_texts = item.get('appendix_texts')
+    if appendix_texts is None:
+        appendix_texts = load_all_appendices(item.get('appendix_paths') or [])
+    appendix_text = '\n'.join([f"{basename}:\n{text}" for basename, text in appendix_texts.items()])
+    evidence = match_dept_evidence(f"{item.get('title') or ''}\n{item.get('content') or ''}\n{appendix_text}")
+    return {
+        'departments': _post_process_dept_result(set(evidence)),
+        'evidence': evidence,
+    }
+
+def classify_many(items: list[dict], workers: int | None = None, chunksize: int = 32) -> list[dict]:
+    '''classify many announcements at once
+    items: list of dict with title, content and appendix_texts ({basename: text}) or appendix_paths
+    workers: int, worker processes (default: CPU count); small batches run in-process
+
+    return: list of {'departments': set, 'evidence': {department: set of matched keywords}}, same order as items
+    '''
+    if not isinstance(items, list):
+        raise ValueError("items must be a list of dicts.")
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(items) < BATCH_SERIAL_THRESHOLD:
+        return [_classify_item(item) for item in items]
+    from concurrent.futures import ProcessPoolExecutor
+    # Workers inherit the compiled automaton (fork) or rebuild it once on import (spawn)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_classify_item, items, chunksize=chunksize))
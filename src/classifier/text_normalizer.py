@@ -0,0 +1,54 @@
+"""
+One-pass text normalization before keyword matching.
+
+Keyword rules and announcement text are both passed through the same
+str.translate table, so spelling variants meet in one canonical form instead
+of each needing its own row in rule.xlsx:
+
+- full-width ASCII (０-９, Ａ-Ｚ, ！-～) becomes half-width, latin letters lower-cased
+- common simplified characters become traditional (Law_Lib_Crawler pages)
+- whitespace, line breaks and zero-width characters are removed (words broken
+  across lines by PDF extraction)
+"""
+
+# 常見簡體字 -> 繁體字（只收錄一對一、且簡體字在繁體文本中不單獨使用者）
+_SIMPLIFIED = (
+    "业务证银险货币汇兑监会员规则办条项关发资产负债经营账户权应计报财审议订说书记录纪处罚违约单据额贷税费结价场买卖问题构机实际进围内个国电网络数风总简体运动时间对该请县厅劳职亿万与为这让当从们过还将无称样类组织团备检测认许适标视导变缴纳贸销购级补续签两双号页档线连质众担领长门东华湾区层执师宝"
+)
+_TRADITIONAL = (
+    "業務證銀險貨幣匯兌監會員規則辦條項關發資產負債經營帳戶權應計報財審議訂說書記錄紀處罰違約單據額貸稅費結價場買賣問題構機實際進圍內個國電網絡數風總簡體運動時間對該請縣廳勞職億萬與為這讓當從們過還將無稱樣類組織團備檢測認許適標視導變繳納貿銷購級補續簽兩雙號頁檔線連質眾擔領長門東華灣區層執師寶"
+)
+assert len(_SIMPLIFIED) == len(_TRADITIONAL), "simplified/traditional maps must align"
+
+_WHITESPACE = " \t\n\r\f\v\u3000\xa0\u200b\u200c\u200d\ufeff"
+
+
+def _build_table(strip_whitespace: bool) -> dict[int, int | None]:
+    table: dict[int, int | None] = {}
+    for code in range(0xFF01, 0xFF5F):  # ！ .. ～
+        table[code] = ord(chr(code - 0xFEE0).lower())
+    for code in range(ord('A'), ord('Z') + 1):
+        table[code] = code + 32
+    table.update(str.maketrans(_SIMPLIFIED, _TRADITIONAL))
+    if strip_whitespace:
+        table.update({ord(ch): None for ch in _WHITESPACE})
+    else:
+        table[0x3000] = ord(' ')
+    return table
+
+
+NORMALIZE_TABLE = _build_table(strip_whitespace=True)
+# Same folding but whitespace kept, for tokenizers that split on it
+FOLD_TABLE = _build_table(strip_whitespace=False)
+
+
+def normalize_text(text: str, strip_whitespace: bool = True) -> str:
+    '''fold width, case and simplified variants in a single str.translate pass
+    text: str
+    strip_whitespace: bool, also remove whitespace and line breaks
+
+    return: str, normalized text
+    '''
+    if not text:
+        return ''
+    return text.translate(NORMALIZE_TABLE if strip_whitespace else FOLD_TABLE)
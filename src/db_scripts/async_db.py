@@ -0,0 +1,61 @@
+"""
+Async facade over the synchronous mssql_python data access.
+
+FastAPI handlers are coroutines; a query run on the event loop freezes every
+other request, polling endpoints included. run_db runs the call in a
+dedicated, bounded thread pool (sized like the connection pool, so a burst
+queues here instead of timing out in db_pool.acquire) and gives up waiting
+after a timeout.
+"""
+import asyncio
+import functools
+import logging
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+DB_WORKERS = config.getint('Database', 'async_workers',
+                           fallback=config.getint('Database', 'pool_max_size', fallback=10))
+# Seconds a handler waits for one DB call
+DB_CALL_TIMEOUT = config.getfloat('Database', 'async_timeout', fallback=30.0)
+
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix='db')
+
+
+class DBTimeout(Exception):
+    """A DB call did not finish within its timeout."""
+
+
+async def run_db(func: Callable, *args, timeout: float | None = DB_CALL_TIMEOUT, **kwargs) -> Any:
+    """Run a blocking DB function in the DB thread pool.
+
+    Args:
+        func (Callable): Synchronous function doing the DB work.
+        *args, **kwargs: Passed to func.
+        timeout (float | None): Seconds to wait; None waits indefinitely. Pass None for
+            writes: a timed-out transaction still commits, the caller just stops knowing.
+
+    Returns:
+        Any: func's return value.
+
+    Raises:
+        DBTimeout: func did not finish in time. The running query cannot be
+            interrupted; its thread finishes it and returns the connection.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        name = getattr(func, '__qualname__', repr(func))
+        logger.error(f"DB call {name} timed out after {timeout}s")
+        raise DBTimeout(f"{name} timed out after {timeout}s")
+
+
+def shutdown_executor():
+    """Drop queued DB calls and let running ones finish (application shutdown)."""
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,222 @@
+"""
+Thread-safe pool of SQL Server connections.
+
+Opening an mssql_python connection costs a TCP + TLS handshake and a login;
+the pool keeps a few of them open and hands them out to get_db_connection.
+Connections idle longer than health_check_after are pinged before reuse,
+idle ones above min_size are closed after max_idle seconds, and every
+connection is replaced after max_lifetime seconds.
+"""
+import time
+import threading
+import logging
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection became available within acquire_timeout."""
+
+
+class _PooledConnection:
+    __slots__ = ('conn', 'created', 'last_used')
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections."""
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 max_idle: float = 300.0, max_lifetime: float = 1800.0,
+                 acquire_timeout: float = 30.0, health_check_after: float = 60.0):
+        """
+        Args:
+            connect (Callable): Opens a new connection.
+            min_size (int): Idle connections kept open even when unused.
+            max_size (int): Upper bound of open connections.
+            max_idle (float): Seconds before an idle connection above min_size is closed.
+            max_lifetime (float): Seconds before a connection is replaced.
+            acquire_timeout (float): Seconds to wait for a free connection.
+            health_check_after (float): Idle seconds after which a connection is pinged before reuse.
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Invalid pool size")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.acquire_timeout = acquire_timeout
+        self.health_check_after = health_check_after
+        self._idle: list[_PooledConnection] = []
+        self._in_use: dict[int, _PooledConnection] = {}
+        self._opening = 0
+        self._cond = threading.Condition()
+        self._stats = {'created': 0, 'closed': 0, 'acquired': 0, 'reused': 0,
+                       'health_check_failed': 0, 'timeouts': 0, 'wait_time_total': 0.0}
+
+    # ---- internal helpers (call without holding the lock unless noted) ----
+    def _open(self) -> _PooledConnection:
+        conn = self._connect()
+        with self._cond:
+            self._stats['created'] += 1
+        return _PooledConnection(conn)
+
+    def _close(self, pooled: _PooledConnection):
+        try:
+            pooled.conn.close()
+        except Exception as e:
+            logger.warning(f"Closing pooled connection failed: {e}")
+        with self._cond:
+            self._stats['closed'] += 1
+
+    def _healthy(self, pooled: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - pooled.created > self.max_lifetime:
+            return False
+        if now - pooled.last_used < self.health_check_after:
+            return True
+        try:
+            cursor = pooled.conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled connection failed health check: {e}")
+            with self._cond:
+                self._stats['health_check_failed'] += 1
+            return False
+
+    def _total(self) -> int:
+        # holding the lock
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    # ---- public API ----
+    def acquire(self) -> Any:
+        """Borrow a connection; blocks up to acquire_timeout when the pool is exhausted."""
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+        while True:
+            pooled = None
+            with self._cond:
+                while not self._idle and self._total() >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f"No DB connection available within {self.acquire_timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    # Most recently used first: keeps the rest idle long enough to be recycled
+                    pooled = self._idle.pop()
+                else:
+                    self._opening += 1
+            if pooled is not None:
+                if self._healthy(pooled):
+                    with self._cond:
+                        self._stats['reused'] += 1
+                    break
+                self._close(pooled)
+                continue
+            try:
+                pooled = self._open()
+            finally:
+                with self._cond:
+                    self._opening -= 1
+                    self._cond.notify()
+            break
+        with self._cond:
+            self._in_use[id(pooled.conn)] = pooled
+            self._stats['acquired'] += 1
+            self._stats['wait_time_total'] += time.monotonic() - start
+        return pooled.conn
+
+    def release(self, conn: Any, broken: bool = False):
+        """Return a borrowed connection; pending work is rolled back, broken ones are closed."""
+        with self._cond:
+            pooled = self._in_use.pop(id(conn), None)
+        if pooled is None:
+            # Not ours (pool was reset); just close it
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        if not broken:
+            try:
+                # Never hand out a connection with an open transaction
+                conn.rollback()
+            except Exception as e:
+                logger.warning(f"Rollback on release failed, discarding connection: {e}")
+                broken = True
+        if broken:
+            self._close(pooled)
+            with self._cond:
+                self._cond.notify()
+            return
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def recycle_idle(self):
+        """Close idle connections above min_size that were unused for max_idle seconds, or past max_lifetime."""
+        now = time.monotonic()
+        to_close = []
+        with self._cond:
+            keep = []
+            # Oldest-used first, so the most recently used ones are kept
+            for pooled in sorted(self._idle, key=lambda p: p.last_used):
+                expired = now - pooled.created > self.max_lifetime
+                idle_too_long = now - pooled.last_used > self.max_idle
+                if expired or (idle_too_long and len(self._idle) - len(to_close) > self.min_size):
+                    to_close.append(pooled)
+                else:
+                    keep.append(pooled)
+            self._idle = keep
+        for pooled in to_close:
+            self._close(pooled)
+
+    def fill(self):
+        """Open connections until min_size are idle or open (best effort)."""
+        while True:
+            with self._cond:
+                if self._total() >= self.min_size:
+                    return
+                self._opening += 1
+            try:
+                pooled = self._open()
+            except Exception as e:
+                logger.error(f"Opening DB connection for the pool failed: {e}")
+                with self._cond:
+                    self._opening -= 1
+                return
+            with self._cond:
+                self._opening -= 1
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection; borrowed ones are closed when released."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._in_use.clear()
+        for pooled in idle:
+            self._close(pooled)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'opening': self._opening,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'wait_time_avg': stats['wait_time_total'] / stats['acquired'] if stats['acquired'] else 0.0,
+            })
+        return stats
@@ -1,4 +1,5 @@
 import re
+import hashlib
 import configparser
 import logging
 from mssql_python import connect
@@ -12,6 +13,7 @@ SQL_CONNECTION_STRING = config['Database']['SQL_CONNECTION_STRING'].replace('"',
 DB_SCHEMA = config['Database'].get('DB_SCHEMA', 'dbo')
 TABLE_NAME = 'messages'
 TASKS_TABLE_NAME = 'approval_tasks'
+DEPT_TABLE_NAME = 'message_departments'
 
 def check_connection():
     try:
@@ -34,114 +36,128 @@ def _qname(schema: str, table: str) -> str:
     # return a safe schema-qualified name like [schema].[table]
     return f"[{schema}].[{table}]"
 
+def link_hash(link: str) -> str:
+    # same value as the persisted messages.link_hash column (SHA2_256 over NVARCHAR = UTF-16LE bytes)
+    return hashlib.sha256((link or '').encode('utf-16-le')).hexdigest().upper()
+
+def _index_states(cursor, schema: str, table: str) -> dict:
+    # {index name (lower): (is_unique, has_filter)} of the live table
+    cursor.execute("""
+        SELECT i.name, i.is_unique, i.has_filter FROM sys.indexes i JOIN sys.tables t ON i.object_id = t.object_id
+        WHERE t.name = ? AND SCHEMA_NAME(t.schema_id) = ? AND i.name IS NOT NULL
+    """, (table, schema))
+    return {row[0].lower(): (bool(row[1]), bool(row[2])) for row in cursor.fetchall()}
+
+def _index_matches(idx: dict, state: tuple) -> bool:
+    # live index has the uniqueness and filtering of its definition
+    return state == (bool(idx.get('unique')), bool(idx.get('where')))
+
+def _create_missing_indexes(conn, cursor, schema: str, table: str, definition: dict):
+    # create the indexes of a table definition that do not exist yet, and rebuild the ones
+    # whose uniqueness or filter differs from the definition
+    existing = _index_states(cursor, schema, table)
+    qname = _qname(schema, table)
+    for idx in definition.get('indexes', []):
+        idx_name = idx['name']
+        state = existing.get(idx_name.lower())
+        if state is not None and _index_matches(idx, state):
+            continue
+        idx_cols = ", ".join(idx['columns'])
+        unique = 'UNIQUE ' if idx.get('unique') else ''
+        # Filtered index; the predicate cannot reference a computed column
+        where = f" WHERE {idx['where']}" if idx.get('where') else ''
+        try:
+            if state is not None:
+                cursor.execute(f"DROP INDEX {idx_name} ON {qname}")
+                logger.info(f"Dropped index {idx_name} to rebuild it as defined")
+            cursor.execute(f"CREATE {unique}INDEX {idx_name} ON {qname} ({idx_cols}){where}")
+            conn.commit()
+            logger.info(f"Created index {idx_name}")
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"Failed to create index {idx_name}: {e}")
+            if unique and state is None:
+                # Existing duplicate rows block a unique index; keep lookups indexed anyway
+                try:
+                    cursor.execute(f"CREATE INDEX {idx_name} ON {qname} ({idx_cols})")
+                    conn.commit()
+                    logger.warning(f"Created {idx_name} as a non-unique index; remove duplicate rows and run "
+                                   f"python -m src.db_scripts.migrations --reconcile")
+                except Exception as e2:
+                    logger.warning(f"Failed to create index {idx_name}: {e2}")
+
+def _create_table(conn, cursor, schema: str, table: str, definition: dict):
+    # CREATE TABLE from its definition (columns, foreign keys, composite primary key)
+    qname = _qname(schema, table)
+    logger.info(f"Creating table {qname}...")
+    columns_sql = []
+    for col in definition['columns']:
+        columns_sql.append(f"{col['name']} {col['type']} {col['constraints']}")
+
+    if 'foreign_keys' in definition:
+        for fk in definition['foreign_keys']:
+            ref_parts = fk['references'].split('(')
+            ref_table = ref_parts[0]
+            ref_col = ref_parts[1].rstrip(')')
+            ref_qname = _qname(schema, ref_table)
+            on_delete = f" ON DELETE {fk['on_delete']}" if fk.get('on_delete') else ''
+            columns_sql.append(f"FOREIGN KEY ({fk['column']}) REFERENCES {ref_qname}({ref_col}){on_delete}")
+    if 'primary_key' in definition:
+        columns_sql.append(f"PRIMARY KEY ({', '.join(definition['primary_key'])})")
+
+    create_sql = f"CREATE TABLE {qname} ({', '.join(columns_sql)})"
+    cursor.execute(create_sql)
+    conn.commit()
+    logger.info(f"Created table {qname}")
+
+def _add_missing_columns(conn, cursor, schema: str, table: str, definition: dict, only: list = None):
+    # ALTER TABLE ADD for definition columns the table lacks (restricted to `only` when given)
+    qname = _qname(schema, table)
+    cursor.execute(f"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?", (schema, table))
+    existing_columns = {row[0].lower() for row in cursor.fetchall()}
+    wanted = {c.lower() for c in only} if only else None
+
+    for col in definition['columns']:
+        col_name = col['name']
+        if col_name.lower() in existing_columns or (wanted is not None and col_name.lower() not in wanted):
+            continue
+        logger.info(f"Adding missing column {col_name} to {qname}...")
+        # Note: Adding a column with NOT NULL constraint without DEFAULT value to a non-empty table will fail.
+        # Assuming constraints are handled or table is empty/nullable columns for now.
+        alter_sql = f"ALTER TABLE {qname} ADD {col_name} {col['type']} {col['constraints']}"
+        try:
+            cursor.execute(alter_sql)
+            conn.commit()
+            logger.info(f"Added column {col_name}")
+        except Exception as e:
+            logger.error(f"Failed to add column {col_name}: {e}")
+
+def _table_exists(cursor, schema: str, table: str) -> bool:
+    cursor.execute("SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?", (schema, table))
+    return cursor.fetchone() is not None
+
 def init_db(schema: str = DB_SCHEMA, force: bool = False):
+    """
+    Bring the database to the latest schema version (see migrations.py).
+    Startup cost is one version query when the database is up to date.
+    force drops every table first and rebuilds from the first migration.
+    """
     logger.info(f"Initializing database with schema: {schema}, force={force}")
     
     if not _validate_schema(schema):
         logger.error(f"Invalid schema name: {schema}")
         return
 
-    # Check if schema is already valid
-    if not force:
-        try:
-            from src.db_scripts.db_utility import validate_database_schema
-            if validate_database_schema(schema):
-                logger.info("Database schema is valid. No changes made.")
-                return
-            logger.info("Schema validation failed or force is False. Proceeding with initialization.")
-        except ImportError:
-            logger.warning("Could not import validate_database_schema. Skipping validation.")
+    from src.db_scripts.migrations import migrate, drop_all
 
     try:
         conn = connect(SQL_CONNECTION_STRING)
         cursor = conn.cursor()
 
-        # Create schema if missing
-        if schema.lower() not in ('dbo', 'guest', 'sys'):
-             try:
-                cursor.execute(f"IF SCHEMA_ID('{schema}') IS NULL EXEC('CREATE SCHEMA [{schema}]')")
-                conn.commit()
-             except Exception as e:
-                logger.error(f"Create schema failed: {e}")
-
-        # Create Tables based on definition
-        # Order matters for Foreign Keys: approval_tasks first, then messages
-        creation_order = ['approval_tasks', 'messages']
-        
-        for table_key in creation_order:
-            if table_key not in TABLE_DEFINITIONS:
-                continue
-                
-            definition = TABLE_DEFINITIONS[table_key]
-            qname = _qname(schema, table_key)
-            
-            if force:
-                # Drop dependent tables first if dropping approval_tasks
-                if table_key == 'approval_tasks':
-                     msg_qname = _qname(schema, 'messages')
-                     logger.info(f"Dropping dependent table {msg_qname}...")
-                     cursor.execute(f"DROP TABLE IF EXISTS {msg_qname}")
-                
-                logger.info(f"Dropping table {qname}...")
-                cursor.execute(f"DROP TABLE IF EXISTS {qname}")
-                conn.commit()
-
-            # Check if table exists
-            cursor.execute(f"SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?", (schema, table_key))
-            if cursor.fetchone():
-                logger.info(f"Table {qname} already exists. Checking for schema updates...")
-                
-                # Check for missing columns
-                cursor.execute(f"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?", (schema, table_key))
-                existing_columns = {row[0].lower() for row in cursor.fetchall()}
-                
-                for col in definition['columns']:
-                    col_name = col['name']
-                    if col_name.lower() not in existing_columns:
-                        logger.info(f"Adding missing column {col_name} to {qname}...")
-                        # Note: Adding a column with NOT NULL constraint without DEFAULT value to a non-empty table will fail.
-                        # Assuming constraints are handled or table is empty/nullable columns for now.
-                        alter_sql = f"ALTER TABLE {qname} ADD {col_name} {col['type']} {col['constraints']}"
-                        try:
-                            cursor.execute(alter_sql)
-                            conn.commit()
-                            logger.info(f"Added column {col_name}")
-                        except Exception as e:
-                            logger.error(f"Failed to add column {col_name}: {e}")
-                
-                continue
-
-            logger.info(f"Creating table {qname}...")
-            columns_sql = []
-            for col in definition['columns']:
-                columns_sql.append(f"{col['name']} {col['type']} {col['constraints']}")
-            
-            if 'foreign_keys' in definition:
-                for fk in definition['foreign_keys']:
-                    ref_parts = fk['references'].split('(')
-                    ref_table = ref_parts[0]
-                    ref_col = ref_parts[1].rstrip(')')
-                    ref_qname = _qname(schema, ref_table)
-                    columns_sql.append(f"FOREIGN KEY ({fk['column']}) REFERENCES {ref_qname}({ref_col})")
-
-            create_sql = f"CREATE TABLE {qname} ({', '.join(columns_sql)})"
-            cursor.execute(create_sql)
-            conn.commit()
-            logger.info(f"Created table {qname}")
-
-            # Create Indexes
-            if 'indexes' in definition:
-                for idx in definition['indexes']:
-                    idx_name = idx['name']
-                    idx_cols = ", ".join(idx['columns'])
-                    try:
-                        cursor.execute(f"CREATE INDEX {idx_name} ON {qname} ({idx_cols})")
-                        conn.commit()
-                        logger.info(f"Created index {idx_name}")
-                    except Exception as e:
-                        logger.warning(f"Failed to create index {idx_name}: {e}")
-
-        logger.info("Database initialization completed.")
+        if force:
+            drop_all(conn, cursor, schema)
+
+        migrate(conn, cursor, schema)
 
     except Exception as e:
         logger.error(f"init_db failed: {e}")
@@ -2,12 +2,28 @@ import contextlib
 import logging
 import json
 import datetime
+import configparser
 from mssql_python import connect
 from src.db_scripts.db_init import SQL_CONNECTION_STRING
 from src.db_scripts.schema_definition import TABLE_DEFINITIONS
+from src.db_scripts.connection_pool import ConnectionPool
+from src.db_scripts.row_decoder import get_row_decoder
 
 logger = logging.getLogger(__name__)
 
+config = configparser.ConfigParser()
+config.read('config.ini', encoding='utf-8')
+POOL_ENABLED = config.getint('Database', 'pool_enabled', fallback=1) == 1
+db_pool = ConnectionPool(
+    lambda: connect(SQL_CONNECTION_STRING),
+    min_size=config.getint('Database', 'pool_min_size', fallback=1),
+    max_size=config.getint('Database', 'pool_max_size', fallback=10),
+    max_idle=config.getfloat('Database', 'pool_max_idle', fallback=300.0),
+    max_lifetime=config.getfloat('Database', 'pool_max_lifetime', fallback=1800.0),
+    acquire_timeout=config.getfloat('Database', 'pool_acquire_timeout', fallback=30.0),
+    health_check_after=config.getfloat('Database', 'pool_health_check_after', fallback=60.0),
+)
+
 def validate_database_schema(schema_name: str) -> bool:
     """
     Validates if the current database schema matches the defined schema.
@@ -35,6 +51,17 @@ def validate_database_schema(schema_name: str) -> bool:
                 if missing_cols:
                     logger.error(f"Table {table_name} missing columns: {missing_cols}")
                     is_valid = False
+
+                # Check indexes
+                cursor.execute("""
+                    SELECT i.name FROM sys.indexes i JOIN sys.tables t ON i.object_id = t.object_id
+                    WHERE t.name = ? AND SCHEMA_NAME(t.schema_id) = ? AND i.name IS NOT NULL
+                """, (table_name, schema_name))
+                existing_indexes = {row[0].lower() for row in cursor.fetchall()}
+                missing_indexes = {idx['name'].lower() for idx in definition.get('indexes', [])} - existing_indexes
+                if missing_indexes:
+                    logger.error(f"Table {table_name} missing indexes: {missing_indexes}")
+                    is_valid = False
     except Exception as e:
         logger.error(f"Schema validation failed: {e}")
         return False
@@ -45,21 +72,38 @@ def validate_database_schema(schema_name: str) -> bool:
 def get_db_connection():
     """
     Context manager for database connections.
-    Yields a connection object.
-    Automatically handles rollback on error and closing connection.
+    Yields a pooled connection object (a fresh one when [Database] pool_enabled = 0).
+    Automatically handles rollback on error and returning/closing the connection.
     """
     conn = None
+    broken = False
     try:
-        conn = connect(SQL_CONNECTION_STRING)
+        conn = db_pool.acquire() if POOL_ENABLED else connect(SQL_CONNECTION_STRING)
         yield conn
     except Exception as e:
         if conn:
-            conn.rollback()
+            try:
+                conn.rollback()
+            except Exception:
+                # Connection is unusable, do not return it to the pool
+                broken = True
         logger.error(f"Database connection error: {e}")
         raise
     finally:
         if conn:
-            conn.close()
+            if POOL_ENABLED:
+                db_pool.release(conn, broken=broken)
+            else:
+                conn.close()
+
+def fill_pool():
+    """Pre-open the pool's min_size connections, so the next requests skip the login (no-op without pooling)."""
+    if POOL_ENABLED:
+        db_pool.fill()
+
+def get_pool_metrics() -> dict:
+    """Connection pool counters, for the server status endpoint."""
+    return {'enabled': POOL_ENABLED, **db_pool.metrics()} if POOL_ENABLED else {'enabled': False}
 
 def row_to_dict(cursor, row) -> dict:
     """
@@ -68,50 +112,15 @@ def row_to_dict(cursor, row) -> dict:
     """
     if not row:
         return {}
-    
-    columns = [column[0] for column in cursor.description]
-    result = dict(zip(columns, row))
-    
-    # Helper to find key case-insensitively
-    def find_key(target):
-        for k in result:
-            if k.lower() == target.lower():
-                return k
-        return None
-
-    # Handle JSON fields
-    json_fields = ['departments', 'cc_departments', 'attachments']
-    for field in json_fields:
-        key = find_key(field)
-        if key:
-            val = result[key]
-            if isinstance(val, str) and val.strip():
-                try:
-                    result[key] = json.loads(val)
-                except Exception:
-                    # Fallback for attachments if it's comma separated
-                    if field == 'attachments':
-                         result[key] = [s.strip() for s in str(val).split(',') if s.strip()]
-                    else:
-                        result[key] = []
-            elif val is None:
-                 result[key] = []
-
-    # Handle Date formatting
-    date_key = find_key('date')
-    if date_key:
-        val = result[date_key]
-        if isinstance(val, datetime.datetime):
-            result[date_key] = val.strftime('%Y-%m-%d')
-
-    return result
+    return get_row_decoder(cursor).to_dict(row)
 
-def fetch_all_as_dict(cursor):
+def fetch_all_as_dict(cursor, record: bool = False):
     """
-    Fetch all rows from cursor and return as list of dicts.
+    Fetch all rows from cursor and return as list of dicts
+    (namedtuples with attribute access when record is True).
     """
     rows = cursor.fetchall()
-    return [row_to_dict(cursor, row) for row in rows]
+    return get_row_decoder(cursor).decode_all(rows, record=record)
 
 def fetch_one_as_dict(cursor):
     """
@@ -130,9 +139,9 @@ def db_row_to_dict(raw_row) -> dict:
         # Attempt to parse attachments if present in additional columns
         attachments = []
         try:
-            # some schemas may add attachments as a JSON string in a later column (e.g., index 15)
-            if len(raw_row) > 15 and raw_row[15]:
-                raw_attachments = raw_row[15]
+            # attachments is column 14 in TABLE_DEFINITIONS (link_hash follows at 15)
+            if len(raw_row) > 14 and raw_row[14]:
+                raw_attachments = raw_row[14]
                 try:
                     attachments = json.loads(raw_attachments)
                 except Exception:
@@ -2,11 +2,39 @@ import json
 import hashlib
 import datetime
 import logging
-from src.db_scripts.db_init import DB_SCHEMA, TABLE_NAME, _qname
+from src.db_scripts.db_init import DB_SCHEMA, TABLE_NAME, TASKS_TABLE_NAME, DEPT_TABLE_NAME, _qname, link_hash
 from src.db_scripts.db_utility import get_db_connection, fetch_all_as_dict, fetch_one_as_dict
+from src.db_scripts.row_decoder import get_row_decoder
 
 logger = logging.getLogger(__name__)
 
+def sync_message_departments(cursor, where: str, params: tuple = (), schema: str = DB_SCHEMA):
+    ''' Rebuild the message_departments rows of the messages matching `where` (over alias m)
+    from their departments / cc_departments JSON; a department listed in both counts as To, as on the
+    approval page. Runs on the caller's cursor, inside its transaction. '''
+    qname = _qname(schema, TABLE_NAME)
+    dept_qname = _qname(schema, DEPT_TABLE_NAME)
+    cursor.execute(f"DELETE md FROM {dept_qname} md JOIN {qname} m ON md.message_id = m.id WHERE {where}", params)
+    cursor.execute(f"""
+        INSERT INTO {dept_qname} (message_id, dept, kind)
+        SELECT m.id, d.value, 'to' FROM {qname} m
+        CROSS APPLY OPENJSON(CASE WHEN ISJSON(m.departments) = 1 THEN m.departments END) d
+        WHERE {where}
+        UNION
+        SELECT m.id, c.value, 'cc' FROM {qname} m
+        CROSS APPLY OPENJSON(CASE WHEN ISJSON(m.cc_departments) = 1 THEN m.cc_departments END) c
+        WHERE {where}
+          AND NOT EXISTS (SELECT 1 FROM OPENJSON(CASE WHEN ISJSON(m.departments) = 1 THEN m.departments END) d2
+                          WHERE d2.value = c.value)
+    """, tuple(params) * 2)
+
+def _sync_departments_of_ids(cursor, ids: list, schema: str = DB_SCHEMA):
+    ''' sync_message_departments for the given message ids, e.g. the OUTPUT inserted.id of a write;
+    unlike a lookup by link or title, this also covers rows whose link is empty. '''
+    if ids:
+        sync_message_departments(cursor, "m.id IN (SELECT CAST(value AS INT) FROM OPENJSON(?))",
+                                 (json.dumps(list(ids)),), schema)
+
 def get_data_by_title(title: str, schema: str = DB_SCHEMA) -> dict:
     ''' Retrieve a record by title. Returns empty dict if not found. '''
     try:
@@ -14,16 +42,61 @@ def get_data_by_title(title: str, schema: str = DB_SCHEMA) -> dict:
             cursor = conn.cursor()
             title_hash = hashlib.sha256(title.encode('utf-8')).hexdigest()
             qname = _qname(schema, TABLE_NAME)
-            cursor.execute(f"SELECT * FROM {qname} WHERE title_hash = ?", (title_hash,))
-            rows = fetch_all_as_dict(cursor)
-            for row in rows:
-                if row['title'] == title:  # Verify actual title matches to handle collisions
-                    return row
-            return {}
+            # Indexed hash seek; the title comparison rules out hash collisions in SQL
+            cursor.execute(f"SELECT TOP 1 * FROM {qname} WHERE title_hash = ? AND title = ?", (title_hash, title))
+            return fetch_one_as_dict(cursor) or {}
     except Exception as e:
         logger.error(f"get_data_by_title failed: {e}")
         return {}
 
+def get_data_by_keys(keys: list, by: str = 'title', schema: str = DB_SCHEMA) -> dict:
+    """
+    Bulk version of get_data_by_title / get_message_by_link, joined with the status of the owning task.
+
+    All keys go in one JSON parameter, expanded by OPENJSON, so the lookup is
+    one round trip whatever the number of announcements; every key is still an
+    index seek on title_hash or link_hash.
+
+    Args:
+        keys (list): Titles or links.
+        by (str): 'title' or 'link'.
+
+    Returns:
+        dict: {key: message dict with task_status}, keys not in the DB are absent.
+    """
+    if by not in ('title', 'link'):
+        raise ValueError(f"Unsupported lookup key: {by}")
+    keys = list(dict.fromkeys(k for k in keys if k))
+    if not keys:
+        return {}
+    if by == 'title':
+        payload = [{"h": hashlib.sha256(k.encode('utf-8')).hexdigest(), "k": k} for k in keys]
+        match = "m.title_hash = k.h AND m.title = k.k"
+        hash_type = "NVARCHAR(64)"
+    else:
+        payload = [{"h": link_hash(k), "k": k} for k in keys]
+        match = "m.link_hash = k.h AND m.link = k.k"
+        hash_type = "CHAR(64)"
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            qname = _qname(schema, TABLE_NAME)
+            tasks_qname = _qname(schema, TASKS_TABLE_NAME)
+            cursor.execute(f"""
+                SELECT k.k AS lookup_key, m.id, m.title, m.date, m.link, m.departments, m.cc_departments,
+                       m.looked, m.sended, m.task_id, t.status AS task_status
+                FROM OPENJSON(?) WITH (h {hash_type} '$.h', k NVARCHAR(MAX) '$.k') k
+                CROSS APPLY (SELECT TOP 1 * FROM {qname} m WHERE {match}) m
+                LEFT JOIN {tasks_qname} t ON m.task_id = t.task_id
+            """, (json.dumps(payload, ensure_ascii=False),))
+            result = {}
+            for row in fetch_all_as_dict(cursor):
+                result[row.pop('lookup_key')] = row
+            return result
+    except Exception as e:
+        logger.error(f"get_data_by_keys failed: {e}")
+        return {}
+
 def insert_message(item: dict) -> bool:
     if not _check_input_date_format(item):
         logger.error("insert_message failed: invalid input format")
@@ -49,8 +122,10 @@ def insert_message(item: dict) -> bool:
                     UPDATE SET date = source.date, link = source.link, departments = source.departments, cc_departments = source.cc_departments, looked = source.looked, sended = source.sended, title_hash = source.title_hash, datetime = source.datetime, attachments = source.attachments
                 WHEN NOT MATCHED THEN
                     INSERT (title, date, link, departments, cc_departments,  looked, sended, title_hash, datetime, attachments)
-                    VALUES (source.title, source.date, source.link, source.departments, source.cc_departments, source.looked, source.sended, source.title_hash, source.datetime, source.attachments);
+                    VALUES (source.title, source.date, source.link, source.departments, source.cc_departments, source.looked, source.sended, source.title_hash, source.datetime, source.attachments)
+                OUTPUT inserted.id;
             """, (item['title'], dt_date, item['link'], dept_json, cc_dept_json, item['looked'], item['sended'], title_hash, dt, attachments_json))
+            _sync_departments_of_ids(cursor, [row[0] for row in cursor.fetchall()])
             conn.commit()
             return True
     except Exception as e:
@@ -84,7 +159,8 @@ def _check_input_date_format(input_dict: dict) -> bool:
             return False
     elif not isinstance(input_dict['date'], datetime.datetime):
         return False
-    if not isinstance(input_dict['link'], str):
+    # link is the message's key (ux_msg_link_hash): a blank one would collide with every other
+    if not isinstance(input_dict['link'], str) or not input_dict['link'].strip():
         return False
     if not isinstance(input_dict['departments'], list):
         return False
@@ -109,12 +185,14 @@ def update_message_full(item: dict, task_id: str) -> bool:
             # Handle attachments
             attachments_json = json.dumps(item.get('attachments', []))
 
-            # Update based on link (assuming unique)
+            # Update based on link (unique, found through the indexed link_hash)
             cursor.execute(f"""
                 UPDATE {qname}
                 SET title=?, date=?, departments=?, cc_departments=?, looked=?, sended=?, title_hash=?, datetime=?, documentNumber=?, displaySiteName=?, content=?, task_id=?, attachments=?
-                WHERE link=?
-            """, (item['title'], dt_date, dept_json, cc_dept_json, item['looked'], item['sended'], title_hash, dt, item.get('documentNumber'), item.get('displaySiteName'), item.get('content', ''), task_id, attachments_json, item['link']))
+                OUTPUT inserted.id
+                WHERE link_hash=? AND link=?
+            """, (item['title'], dt_date, dept_json, cc_dept_json, item['looked'], item['sended'], title_hash, dt, item.get('documentNumber'), item.get('displaySiteName'), item.get('content', ''), task_id, attachments_json, link_hash(item['link']), item['link']))
+            _sync_departments_of_ids(cursor, [row[0] for row in cursor.fetchall()])
             conn.commit()
             return True
     except Exception as e:
@@ -130,6 +208,7 @@ def update_message_department(message_id: int, departments: list, cc_departments
             qname = _qname(DB_SCHEMA, TABLE_NAME)
             
             cursor.execute(f"UPDATE {qname} SET departments = ?, cc_departments = ? WHERE id = ?", (dept_json, cc_dept_json, message_id))
+            sync_message_departments(cursor, "m.id = ?", (message_id,))
             conn.commit()  # Commit transaction
             return True
     except Exception as e:
@@ -141,8 +220,8 @@ def get_message_by_link(link: str, schema: str = DB_SCHEMA) -> dict:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             qname = _qname(schema, TABLE_NAME)
-            # Assuming link is unique enough or we just want one
-            cursor.execute(f"SELECT * FROM {qname} WHERE link = ?", (link,))
+            # Indexed hash seek; the link comparison rules out hash collisions
+            cursor.execute(f"SELECT * FROM {qname} WHERE link_hash = ? AND link = ?", (link_hash(link), link))
             return fetch_one_as_dict(cursor) or {}
     except Exception as e:
         logger.error(f"get_message_by_link failed: {e}")
@@ -190,10 +269,301 @@ def insert_message_with_task(item: dict, task_id: str) -> bool:
 
             cursor.execute(f"""
                 INSERT INTO {qname} (title, date, link, departments, cc_departments, looked, sended, title_hash, datetime, documentNumber, displaySiteName, content, task_id, attachments)
+                OUTPUT inserted.id
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (item['title'], dt_date, item['link'], dept_json, cc_dept_json, item['looked'], item['sended'], title_hash, dt, item.get('documentNumber'), item.get('displaySiteName'), item.get('content', ''), task_id, attachments_json))
+            _sync_departments_of_ids(cursor, [row[0] for row in cursor.fetchall()])
             conn.commit()
             return True
     except Exception as e:
         logger.error(f"insert_message_with_task failed: {e}")
         return False
+
+def get_approved_messages(schema: str = DB_SCHEMA) -> list:
+    ''' Messages whose task was approved (1) or done (2), with their human-approved departments. '''
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            qname = _qname(schema, TABLE_NAME)
+            tasks_qname = _qname(schema, TASKS_TABLE_NAME)
+            cursor.execute(f"""
+                SELECT m.id, m.title, m.date, m.link, m.departments, m.cc_departments, m.displaySiteName, m.content, m.task_id
+                FROM {qname} m JOIN {tasks_qname} t ON m.task_id = t.task_id
+                WHERE t.status IN (1, 2)
+                ORDER BY m.id
+            """)
+            return fetch_all_as_dict(cursor)
+    except Exception as e:
+        logger.error(f"get_approved_messages failed: {e}")
+        return []
+
+def get_messages_for_reclassify(scope: str = 'pending', days: int = 14, schema: str = DB_SCHEMA) -> list:
+    ''' Messages to re-classify: 'pending' = task awaiting approval (status 0), 'recent' = saved in the last `days` days. '''
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            qname = _qname(schema, TABLE_NAME)
+            tasks_qname = _qname(schema, TASKS_TABLE_NAME)
+            columns = "m.id, m.title, m.link, m.departments, m.cc_departments, m.content, m.task_id"
+            if scope == 'pending':
+                cursor.execute(f"""
+                    SELECT {columns} FROM {qname} m JOIN {tasks_qname} t ON m.task_id = t.task_id
+                    WHERE t.status = 0
+                """)
+            else:
+                cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+                cursor.execute(f"SELECT {columns} FROM {qname} m WHERE m.datetime >= ?", (cutoff,))
+            return fetch_all_as_dict(cursor)
+    except Exception as e:
+        logger.error(f"get_messages_for_reclassify failed: {e}")
+        return []
+
+LOOKUP_COLUMNS = "m.id, m.title, m.date, m.link, m.departments, m.cc_departments, m.displaySiteName, m.sended"
+
+def _encode_lookup_cursor(date_value, msg_id: int) -> str:
+    if isinstance(date_value, datetime.datetime):
+        date_value = date_value.isoformat()
+    return f"{date_value}|{msg_id}"
+
+def _decode_lookup_cursor(cursor_value: str) -> tuple:
+    date_part, _, id_part = cursor_value.rpartition('|')
+    return datetime.datetime.fromisoformat(date_part), int(id_part)
+
+def _page_conditions(after: str = None, date_from: str = None, date_to: str = None) -> tuple[list, list]:
+    ''' WHERE conditions (over alias m) and parameters for one keyset page on (date DESC, id DESC). '''
+    conditions = ["m.date IS NOT NULL"]
+    params = []
+    if after:
+        after_date, after_id = _decode_lookup_cursor(after)
+        conditions.append("(m.date < ? OR (m.date = ? AND m.id < ?))")
+        params += [after_date, after_date, after_id]
+    if date_from:
+        conditions.append("m.date >= ?")
+        params.append(datetime.datetime.strptime(date_from, '%Y-%m-%d'))
+    if date_to:
+        conditions.append("m.date < ?")
+        params.append(datetime.datetime.strptime(date_to, '%Y-%m-%d') + datetime.timedelta(days=1))
+    return conditions, params
+
+def _fetch_page(cursor, page_size: int) -> tuple[list, str | None]:
+    ''' Rows of a TOP (page_size + 1) keyset query (id first, date third) and the next-page cursor. '''
+    rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _encode_lookup_cursor(rows[-1][2], rows[-1][0])
+    return get_row_decoder(cursor).decode_all(rows), next_cursor
+
+def lookup_messages(after: str = None, page_size: int = 50, date_from: str = None, date_to: str = None,
+                    site: str = None, department: str = None, sended: bool | None = True,
+                    schema: str = DB_SCHEMA) -> tuple[list, str | None]:
+    """
+    One page of messages for the lookup page, newest first.
+
+    Keyset pagination on (date DESC, id DESC), so every page is an index seek
+    whatever its depth; only the columns the page shows are read.
+
+    Args:
+        after (str): Cursor returned with the previous page, None for the first page.
+        page_size (int): Rows per page.
+        date_from (str): Earliest date, YYYY-MM-DD, inclusive.
+        date_to (str): Latest date, YYYY-MM-DD, inclusive.
+        site (str): displaySiteName to match.
+        department (str): Department in departments or cc_departments.
+        sended (bool | None): Sent flag to match; None for both.
+
+    Returns:
+        tuple: (list of dict, cursor of the next page or None on the last page).
+    """
+    try:
+        conditions, params = _page_conditions(after, date_from, date_to)
+        if site:
+            conditions.append("m.displaySiteName = ?")
+            params.append(site)
+        if department:
+            conditions.append(f"EXISTS (SELECT 1 FROM {_qname(schema, DEPT_TABLE_NAME)} md WHERE md.message_id = m.id AND md.dept = ?)")
+            params.append(department)
+        if sended is not None:
+            conditions.append("m.sended = ?" if sended else "(m.sended = ? OR m.sended IS NULL)")
+            params.append(1 if sended else 0)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            qname = _qname(schema, TABLE_NAME)
+            # One extra row tells whether there is a next page
+            cursor.execute(f"""
+                SELECT TOP ({int(page_size) + 1}) {LOOKUP_COLUMNS}
+                FROM {qname} m
+                WHERE {" AND ".join(conditions)}
+                ORDER BY m.date DESC, m.id DESC
+            """, params)
+            return _fetch_page(cursor, page_size)
+    except Exception as e:
+        logger.error(f"lookup_messages failed: {e}")
+        return [], None
+
+def get_department_inbox(dept: str, kind: str = None, after: str = None, page_size: int = 50,
+                         date_from: str = None, date_to: str = None, schema: str = DB_SCHEMA) -> tuple[list, str | None]:
+    """
+    Messages routed to one department, newest first, through the message_departments index.
+
+    Args:
+        dept (str): Department name.
+        kind (str): 'to' or 'cc'; None for both.
+        after (str): Cursor returned with the previous page, None for the first page.
+        page_size (int): Rows per page.
+        date_from (str): Earliest date, YYYY-MM-DD, inclusive.
+        date_to (str): Latest date, YYYY-MM-DD, inclusive.
+
+    Returns:
+        tuple: (list of dict with a 'kind' key, cursor of the next page or None on the last page).
+    """
+    try:
+        conditions, params = _page_conditions(after, date_from, date_to)
+        conditions.append("md.dept = ?")
+        params.append(dept)
+        if kind:
+            conditions.append("md.kind = ?")
+            params.append(kind)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            qname = _qname(schema, TABLE_NAME)
+            dept_qname = _qname(schema, DEPT_TABLE_NAME)
+            # (message_id, dept) is the key, so the join does not repeat rows
+            cursor.execute(f"""
+                SELECT TOP ({int(page_size) + 1}) {LOOKUP_COLUMNS}, md.kind, m.task_id
+                FROM {dept_qname} md JOIN {qname} m ON m.id = md.message_id
+                WHERE {" AND ".join(conditions)}
+                ORDER BY m.date DESC, m.id DESC
+            """, params)
+            return _fetch_page(cursor, page_size)
+    except Exception as e:
+        logger.error(f"get_department_inbox failed: {e}")
+        return [], None
+
+def count_department_messages(date_from: str = None, date_to: str = None, sended: bool | None = None,
+                              schema: str = DB_SCHEMA) -> dict:
+    """
+    Number of messages per department, for dashboards.
+
+    Args:
+        date_from (str): Earliest date, YYYY-MM-DD, inclusive.
+        date_to (str): Latest date, YYYY-MM-DD, inclusive.
+        sended (bool | None): Sent flag to match; None for both.
+
+    Returns:
+        dict: {dept: {'to': int, 'cc': int}}
+    """
+    try:
+        conditions, params = _page_conditions(None, date_from, date_to)
+        if sended is not None:
+            conditions.append("m.sended = ?" if sended else "(m.sended = ? OR m.sended IS NULL)")
+            params.append(1 if sended else 0)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            qname = _qname(schema, TABLE_NAME)
+            dept_qname = _qname(schema, DEPT_TABLE_NAME)
+            cursor.execute(f"""
+                SELECT md.dept, md.kind, COUNT(*)
+                FROM {dept_qname} md JOIN {qname} m ON m.id = md.message_id
+                WHERE {" AND ".join(conditions)}
+                GROUP BY md.dept, md.kind
+            """, params)
+            counts = {}
+            for dept, kind, count in cursor.fetchall():
+                counts.setdefault(dept, {'to': 0, 'cc': 0})[kind] = count
+            return counts
+    except Exception as e:
+        logger.error(f"count_department_messages failed: {e}")
+        return {}
+
+def save_task_messages(task_id: str, items: list, schema: str = DB_SCHEMA) -> bool:
+    ''' Save a whole task in one transaction: create the task, stage every announcement with one
+    parameter-array insert, then resolve takeovers, remark logging and inserts with set-based statements.
+    Same outcome as create_task + get_message_by_link / update_message_full / insert_message_with_task
+    per announcement, but atomic. Returns False (and changes nothing) on any failure. '''
+    rows = []
+    now = datetime.datetime.now()
+    for seq, item in enumerate(items):
+        if not _check_input_date_format(item):
+            logger.error(f"save_task_messages skipped invalid item: {item.get('title')}")
+            continue
+        dt_date = datetime.datetime.strptime(item['date'], '%Y-%m-%d') if isinstance(item['date'], str) else item['date']
+        rows.append((seq, item['title'], dt_date, item['link'],
+                     json.dumps(item['departments']), json.dumps(item.get('cc_departments', [])),
+                     item['looked'], item['sended'], hashlib.sha256(item['title'].encode('utf-8')).hexdigest(),
+                     item.get('datetime', now), item.get('documentNumber'), item.get('displaySiteName'),
+                     item.get('content', ''), json.dumps(item.get('attachments', []))))
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            qname = _qname(schema, TABLE_NAME)
+            tasks_qname = _qname(schema, TASKS_TABLE_NAME)
+            cursor.execute(f"INSERT INTO {tasks_qname} (task_id, status) VALUES (?, 0)", (task_id,))
+
+            # Session temp table; pooled connections are reused, so drop any leftover first
+            cursor.execute("""
+                IF OBJECT_ID('tempdb..#save_staging') IS NOT NULL DROP TABLE #save_staging;
+                CREATE TABLE #save_staging (
+                    seq INT, title NVARCHAR(MAX), date DATETIME2, link NVARCHAR(MAX),
+                    departments NVARCHAR(MAX), cc_departments NVARCHAR(MAX), looked BIT, sended BIT,
+                    title_hash NVARCHAR(64), datetime DATETIME2, documentNumber NVARCHAR(64),
+                    displaySiteName NVARCHAR(64), content NVARCHAR(MAX), attachments NVARCHAR(MAX),
+                    link_hash AS CONVERT(CHAR(64), HASHBYTES('SHA2_256', link), 2) PERSISTED)
+            """)
+            if rows:
+                cursor.executemany("""
+                    INSERT INTO #save_staging (seq, title, date, link, departments, cc_departments, looked, sended,
+                        title_hash, datetime, documentNumber, displaySiteName, content, attachments)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+            # The same link twice in one task: the later one wins, as with sequential saving
+            cursor.execute("""
+                DELETE s FROM #save_staging s
+                WHERE EXISTS (SELECT 1 FROM #save_staging s2 WHERE s2.link_hash = s.link_hash AND s2.link = s.link AND s2.seq > s.seq)
+            """)
+
+            # Approved (1) / done (2) tasks losing a message get a log line in their remark
+            now_str = now.strftime('%Y-%m-%d %H:%M:%S')
+            cursor.execute(f"""
+                UPDATE t
+                SET remark = CASE WHEN t.remark IS NULL OR t.remark = N'' THEN l.log ELSE t.remark + N'; ' + l.log END
+                FROM {tasks_qname} t
+                JOIN (
+                    SELECT m.task_id,
+                           STRING_AGG(CONVERT(NVARCHAR(MAX), N'[Log] ' + ? + N' 公告 "' + s.title + N'" 已重新送出至新任務 ' + ?), N'; ')
+                               WITHIN GROUP (ORDER BY s.seq) AS log
+                    FROM #save_staging s
+                    JOIN {qname} m ON m.link_hash = s.link_hash AND m.link = s.link
+                    JOIN {tasks_qname} ot ON ot.task_id = m.task_id
+                    WHERE ot.status IN (1, 2) AND m.task_id <> ?
+                    GROUP BY m.task_id
+                ) l ON l.task_id = t.task_id
+            """, (now_str, task_id, task_id))
+
+            # Existing messages (any previous status) are taken over by this task
+            cursor.execute(f"""
+                UPDATE m
+                SET title = s.title, date = s.date, departments = s.departments, cc_departments = s.cc_departments,
+                    looked = s.looked, sended = s.sended, title_hash = s.title_hash, datetime = s.datetime,
+                    documentNumber = s.documentNumber, displaySiteName = s.displaySiteName, content = s.content,
+                    task_id = ?, attachments = s.attachments
+                FROM {qname} m JOIN #save_staging s ON m.link_hash = s.link_hash AND m.link = s.link
+            """, (task_id,))
+
+            cursor.execute(f"""
+                INSERT INTO {qname} (title, date, link, departments, cc_departments, looked, sended, title_hash,
+                    datetime, documentNumber, displaySiteName, content, task_id, attachments)
+                SELECT s.title, s.date, s.link, s.departments, s.cc_departments, s.looked, s.sended, s.title_hash,
+                    s.datetime, s.documentNumber, s.displaySiteName, s.content, ?, s.attachments
+                FROM #save_staging s
+                WHERE NOT EXISTS (SELECT 1 FROM {qname} m WHERE m.link_hash = s.link_hash AND m.link = s.link)
+                ORDER BY s.seq
+            """, (task_id,))
+            cursor.execute("DROP TABLE #save_staging")
+            # Every saved message now belongs to this task
+            sync_message_departments(cursor, "m.task_id = ?", (task_id,), schema)
+            conn.commit()
+            return True
+    except Exception as e:
+        logger.error(f"save_task_messages failed: {e}")
+        return False
@@ -0,0 +1,256 @@
+"""
+Versioned schema migrations.
+
+The database records the migrations it went through in schema_version,
+together with a fingerprint of TABLE_DEFINITIONS. At startup init_db reads
+the latest row in one query; when the version and fingerprint match nothing
+else is inspected. Otherwise the pending migrations run in order and are
+recorded one by one.
+
+A migration names the TABLE_DEFINITIONS objects it introduces (tables,
+columns, indexes); the DDL is generated from their definitions and every
+step checks what already exists, so a migration interrupted halfway can run
+again. Databases created before this module start at version 0 and only get
+what they lack.
+
+To change the schema: edit TABLE_DEFINITIONS, then append a migration.
+`python -m src.db_scripts.migrations --diff` prints the entry for the
+objects the live database lacks. A definition change without a migration is
+still applied at the next startup (with a warning), from the live diff;
+`--reconcile` does the same on demand, e.g. after dropping an index by hand.
+"""
+import json
+import hashlib
+import argparse
+import logging
+
+from src.db_scripts.schema_definition import TABLE_DEFINITIONS
+from src.db_scripts.db_init import (
+    DB_SCHEMA, DEPT_TABLE_NAME, _qname, _create_table, _add_missing_columns,
+    _create_missing_indexes, _table_exists, _index_states, _index_matches,
+)
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = 'schema_version'
+
+
+def _backfill_message_departments(conn, cursor, schema: str):
+    from src.db_scripts.message_manager import sync_message_departments
+    sync_message_departments(cursor, "1 = 1", (), schema)
+    conn.commit()
+
+
+# Ordered, append only. Tables are listed parents first (foreign keys).
+MIGRATIONS = [
+    {"version": 1, "name": "approval_tasks and messages",
+     "tables": ["approval_tasks", "messages"]},
+    {"version": 2, "name": "indexed title, task and link lookups",
+     "columns": {"messages": ["link_hash"]},
+     "indexes": {"approval_tasks": ["idx_tasks_status_created"],
+                 "messages": ["idx_title_hash", "idx_msg_task_id", "ux_msg_link_hash"]}},
+    {"version": 3, "name": "keyset index of the lookup page",
+     "indexes": {"messages": ["idx_msg_date_id"]}},
+    {"version": 4, "name": "message_departments junction table",
+     "tables": [DEPT_TABLE_NAME],
+     "indexes": {DEPT_TABLE_NAME: ["idx_msgdept_dept_kind"]},
+     "after": _backfill_message_departments},
+    {"version": 5, "name": "ux_msg_link_hash rebuilt as a plain unique index",
+     "indexes": {"messages": ["ux_msg_link_hash"]}},
+]
+LATEST_VERSION = MIGRATIONS[-1]["version"]
+
+
+def definitions_fingerprint() -> str:
+    return hashlib.sha256(json.dumps(TABLE_DEFINITIONS, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def current_state(cursor, schema: str = DB_SCHEMA) -> tuple[int, str | None]:
+    ''' (version, fingerprint) recorded in the database; (0, None) before any migration. '''
+    # One round trip; the SELECT on a missing table is never compiled (deferred name resolution)
+    cursor.execute(f"""
+        IF OBJECT_ID(?, 'U') IS NULL
+            SELECT 0, CAST(NULL AS CHAR(64))
+        ELSE
+            SELECT TOP 1 version, fingerprint FROM {_qname(schema, VERSION_TABLE)} ORDER BY version DESC
+    """, (f"{schema}.{VERSION_TABLE}",))
+    row = cursor.fetchone()
+    if not row:
+        return 0, None
+    return row[0], row[1]
+
+
+def _ensure_version_table(conn, cursor, schema: str):
+    if schema.lower() not in ('dbo', 'guest', 'sys'):
+        cursor.execute(f"IF SCHEMA_ID('{schema}') IS NULL EXEC('CREATE SCHEMA [{schema}]')")
+    cursor.execute(f"""
+        IF OBJECT_ID(?, 'U') IS NULL
+            CREATE TABLE {_qname(schema, VERSION_TABLE)} (
+                version INT PRIMARY KEY, name NVARCHAR(200), fingerprint CHAR(64),
+                applied_at DATETIME2 DEFAULT SYSDATETIME())
+    """, (f"{schema}.{VERSION_TABLE}",))
+    conn.commit()
+
+
+def _only_indexes(table: str, names: list) -> dict:
+    wanted = {name.lower() for name in names}
+    return {'indexes': [idx for idx in TABLE_DEFINITIONS[table].get('indexes', []) if idx['name'].lower() in wanted]}
+
+
+def _apply(conn, cursor, schema: str, migration: dict):
+    for table in migration.get('tables', []):
+        definition = TABLE_DEFINITIONS[table]
+        if _table_exists(cursor, schema, table):
+            _add_missing_columns(conn, cursor, schema, table, definition)
+        else:
+            _create_table(conn, cursor, schema, table, definition)
+    for table, columns in migration.get('columns', {}).items():
+        _add_missing_columns(conn, cursor, schema, table, TABLE_DEFINITIONS[table], only=columns)
+    for table, names in migration.get('indexes', {}).items():
+        _create_missing_indexes(conn, cursor, schema, table, _only_indexes(table, names))
+    if migration.get('after'):
+        migration['after'](conn, cursor, schema)
+
+
+class MigrationIncomplete(Exception):
+    """A migration ran but some of its objects are missing or differ from their definition."""
+
+
+def schema_diff(cursor, schema: str = DB_SCHEMA) -> dict:
+    ''' TABLE_DEFINITIONS objects missing from the live database, or indexes whose uniqueness /
+    filter differs from the definition (e.g. the non-unique fallback), as a migration entry. '''
+    diff = {"tables": [], "columns": {}, "indexes": {}}
+    for table, definition in TABLE_DEFINITIONS.items():
+        if not _table_exists(cursor, schema, table):
+            diff["tables"].append(table)
+            names = [idx['name'] for idx in definition.get('indexes', [])]
+            if names:
+                diff["indexes"][table] = names
+            continue
+        cursor.execute("SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?",
+                       (schema, table))
+        existing_columns = {row[0].lower() for row in cursor.fetchall()}
+        missing_columns = [c['name'] for c in definition['columns'] if c['name'].lower() not in existing_columns]
+        if missing_columns:
+            diff["columns"][table] = missing_columns
+        existing_indexes = _index_states(cursor, schema, table)
+        missing_indexes = [idx['name'] for idx in definition.get('indexes', [])
+                           if idx['name'].lower() not in existing_indexes
+                           or not _index_matches(idx, existing_indexes[idx['name'].lower()])]
+        if missing_indexes:
+            diff["indexes"][table] = missing_indexes
+    return {key: value for key, value in diff.items() if value}
+
+
+def _gaps(cursor, schema: str, migration: dict) -> dict:
+    ''' the part of schema_diff that concerns the objects of one migration '''
+    diff = schema_diff(cursor, schema)
+    missing_tables = set(diff.get('tables', []))
+    missing_columns = diff.get('columns', {})
+    missing_indexes = {table: {name.lower() for name in names} for table, names in diff.get('indexes', {}).items()}
+    gaps = {}
+    for table in migration.get('tables', []):
+        if table in missing_tables:
+            gaps.setdefault('tables', []).append(table)
+        elif missing_columns.get(table):
+            gaps.setdefault('columns', {})[table] = missing_columns[table]
+    for table, columns in migration.get('columns', {}).items():
+        lacking = [c for c in columns if c.lower() in {m.lower() for m in missing_columns.get(table, [])}]
+        if lacking:
+            gaps.setdefault('columns', {})[table] = lacking
+    for table, names in migration.get('indexes', {}).items():
+        lacking = [name for name in names if name.lower() in missing_indexes.get(table, set())]
+        if lacking:
+            gaps.setdefault('indexes', {})[table] = lacking
+    return gaps
+
+
+def migrate(conn, cursor, schema: str = DB_SCHEMA) -> int:
+    '''
+    Apply pending migrations; returns the resulting version.
+    Raises when a migration fails or leaves any of its objects missing or degraded (column
+    and index helpers only log their errors), leaving its version unrecorded; the next start
+    retries it.
+    '''
+    version, fingerprint = current_state(cursor, schema)
+    target_fingerprint = definitions_fingerprint()
+    if version == LATEST_VERSION and fingerprint == target_fingerprint:
+        logger.info(f"Database schema is at version {version}. No changes made.")
+        return version
+    if version > LATEST_VERSION:
+        logger.warning(f"Database schema version {version} is newer than this code ({LATEST_VERSION}); not migrating")
+        return version
+
+    _ensure_version_table(conn, cursor, schema)
+    version_qname = _qname(schema, VERSION_TABLE)
+    for migration in MIGRATIONS:
+        if migration["version"] <= version:
+            continue
+        logger.info(f"Applying migration {migration['version']}: {migration['name']}")
+        _apply(conn, cursor, schema, migration)
+        gaps = _gaps(cursor, schema, migration)
+        if gaps:
+            raise MigrationIncomplete(f"Migration {migration['version']} ({migration['name']}) incomplete: {gaps}")
+        cursor.execute(f"INSERT INTO {version_qname} (version, name, fingerprint) VALUES (?, ?, ?)",
+                       (migration["version"], migration["name"], target_fingerprint))
+        conn.commit()
+        version = migration["version"]
+
+    # TABLE_DEFINITIONS edited without a migration: apply the live diff so the app still works
+    diff = schema_diff(cursor, schema)
+    if diff:
+        logger.warning(f"Schema objects not covered by a migration, applying them now: {diff}. "
+                       f"Add them as migration {LATEST_VERSION + 1}.")
+        _apply(conn, cursor, schema, diff)
+        gaps = _gaps(cursor, schema, diff)
+        if gaps:
+            # Keep the old fingerprint, so the next start tries again
+            raise MigrationIncomplete(f"Schema objects could not be applied: {gaps}")
+    cursor.execute(f"UPDATE {version_qname} SET fingerprint = ? WHERE version = ?", (target_fingerprint, version))
+    conn.commit()
+    logger.info(f"Database schema migrated to version {version}")
+    return version
+
+
+def drop_all(conn, cursor, schema: str = DB_SCHEMA):
+    ''' Drop every table of TABLE_DEFINITIONS and the version table (init_db force). '''
+    tables = [table for migration in MIGRATIONS for table in migration.get('tables', [])]
+    for table in [VERSION_TABLE] + tables[::-1]:
+        qname = _qname(schema, table)
+        logger.info(f"Dropping table {qname}...")
+        cursor.execute(f"DROP TABLE IF EXISTS {qname}")
+    conn.commit()
+
+
+def main():
+    from mssql_python import connect
+    from src.db_scripts.db_init import SQL_CONNECTION_STRING
+
+    parser = argparse.ArgumentParser(description="Schema version and migration helper")
+    parser.add_argument('--diff', action='store_true', help="print the migration entry for objects the database lacks")
+    parser.add_argument('--reconcile', action='store_true', help="create the objects the database lacks")
+    parser.add_argument('--schema', default=DB_SCHEMA)
+    args = parser.parse_args()
+
+    conn = connect(SQL_CONNECTION_STRING)
+    try:
+        cursor = conn.cursor()
+        version, fingerprint = current_state(cursor, args.schema)
+        print(f"database version {version} (code {LATEST_VERSION}), "
+              f"definitions {'unchanged' if fingerprint == definitions_fingerprint() else 'changed'}")
+        if args.diff:
+            diff = schema_diff(cursor, args.schema)
+            if diff:
+                print(json.dumps({"version": LATEST_VERSION + 1, "name": "...", **diff}, indent=4))
+            else:
+                print("No missing objects.")
+        if args.reconcile:
+            diff = schema_diff(cursor, args.schema)
+            _apply(conn, cursor, args.schema, diff)
+            print(f"Created: {diff}" if diff else "No missing objects.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
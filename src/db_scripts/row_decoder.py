@@ -0,0 +1,124 @@
+"""
+Row decoding compiled once per result shape.
+
+row_to_dict used to rebuild the column list, search the JSON and date columns
+case-insensitively and branch on every field for each row. A RowDecoder does
+that work once per cursor.description and keeps only a list of
+(index, converter) pairs; decoders are cached by column names, so the same
+query shape is compiled once per process.
+"""
+import json
+import datetime
+import threading
+from functools import lru_cache
+from collections import namedtuple
+from typing import Any, Callable
+
+JSON_FIELDS = ('departments', 'cc_departments', 'attachments')
+DATE_FIELDS = ('date',)
+_MAX_CACHED_DECODERS = 256
+# Department lists repeat across rows; parse each distinct short value once
+_MAX_MEMO_JSON_CHARS = 512
+
+
+@lru_cache(maxsize=4096)
+def _loads_memo(val: str):
+    return json.loads(val)
+
+
+def _loads(val: str):
+    if len(val) > _MAX_MEMO_JSON_CHARS:
+        return json.loads(val)
+    parsed = _loads_memo(val)
+    # Callers may mutate the result; never hand out the cached object
+    return list(parsed) if isinstance(parsed, list) else json.loads(val)
+
+
+def _json_converter(field: str) -> Callable[[Any], Any]:
+    def convert(val):
+        if val is None:
+            return []
+        if isinstance(val, str) and val.strip():
+            try:
+                return _loads(val)
+            except Exception:
+                # Fallback for attachments if it's comma separated
+                if field == 'attachments':
+                    return [s.strip() for s in str(val).split(',') if s.strip()]
+                return []
+        return val
+    return convert
+
+
+def _date_converter(val):
+    if isinstance(val, datetime.datetime):
+        return val.strftime('%Y-%m-%d')
+    return val
+
+
+class RowDecoder:
+    """Converts rows of one result shape to dicts or records."""
+
+    def __init__(self, columns: tuple[str, ...]):
+        self.columns = columns
+        lowered = [c.lower() for c in columns]
+        self.converters: list[tuple[int, Callable]] = []
+        for field in JSON_FIELDS:
+            if field in lowered:
+                self.converters.append((lowered.index(field), _json_converter(field)))
+        for field in DATE_FIELDS:
+            if field in lowered:
+                self.converters.append((lowered.index(field), _date_converter))
+        self._record_type = None
+
+    @classmethod
+    def from_description(cls, description) -> 'RowDecoder':
+        return cls(tuple(column[0] for column in description))
+
+    @property
+    def record_type(self):
+        # Built on first use; rename=True keeps odd column names (e.g. COUNT(*)) valid
+        if self._record_type is None:
+            self._record_type = namedtuple('Record', self.columns, rename=True)
+        return self._record_type
+
+    def _values(self, row) -> list:
+        values = list(row)
+        for idx, convert in self.converters:
+            values[idx] = convert(values[idx])
+        return values
+
+    def to_dict(self, row) -> dict:
+        if not row:
+            return {}
+        return dict(zip(self.columns, self._values(row)))
+
+    def to_record(self, row):
+        if not row:
+            return None
+        return self.record_type._make(self._values(row))
+
+    def decode_all(self, rows, record: bool = False) -> list:
+        """Convert many rows; record=True returns namedtuples instead of dicts."""
+        if record:
+            make = self.record_type._make
+            return [make(self._values(row)) for row in rows]
+        columns = self.columns
+        return [dict(zip(columns, self._values(row))) for row in rows]
+
+
+_decoders: dict[tuple, RowDecoder] = {}
+_lock = threading.Lock()
+
+
+def get_row_decoder(cursor) -> RowDecoder:
+    """Cached decoder for the cursor's current result shape."""
+    columns = tuple(column[0] for column in cursor.description)
+    decoder = _decoders.get(columns)
+    if decoder is None:
+        decoder = RowDecoder(columns)
+        with _lock:
+            if len(_decoders) >= _MAX_CACHED_DECODERS:
+                _decoders.clear()
+            _decoders[columns] = decoder
+    return decoder
@@ -27,14 +27,36 @@ TABLE_DEFINITIONS = {
             {"name": "displaySiteName", "type": "NVARCHAR(64)", "constraints": ""},
             {"name": "content", "type": "NVARCHAR(MAX)", "constraints": ""},
             {"name": "task_id", "type": "VARCHAR(64)", "constraints": ""},
-            {"name": "attachments", "type": "NVARCHAR(MAX)", "constraints": ""}
+            {"name": "attachments", "type": "NVARCHAR(MAX)", "constraints": ""},
+            # NVARCHAR(MAX) link cannot be an index key; its hash can (filled for existing rows on ALTER)
+            {"name": "link_hash", "type": "AS CONVERT(CHAR(64), HASHBYTES('SHA2_256', link), 2) PERSISTED", "constraints": ""}
         ],
         "foreign_keys": [
             {"column": "task_id", "references": "approval_tasks(task_id)"}
         ],
         "indexes": [
             {"name": "idx_title_hash", "columns": ["title_hash"]},
-            {"name": "idx_msg_task_id", "columns": ["task_id"]}
+            {"name": "idx_msg_task_id", "columns": ["task_id"]},
+            # Keyset pagination of the lookup page: ORDER BY date DESC, id DESC
+            {"name": "idx_msg_date_id", "columns": ["date DESC", "id DESC"]},
+            # Not filtered: SQL Server rejects a computed column in a filter predicate, and writers
+            # refuse blank links, so no NULL / empty-link rows compete for the key
+            {"name": "ux_msg_link_hash", "columns": ["link_hash"], "unique": True}
+        ]
+    },
+    # One row per (message, department, to/cc); derived from messages.departments / cc_departments
+    "message_departments": {
+        "columns": [
+            {"name": "message_id", "type": "INT", "constraints": "NOT NULL"},
+            {"name": "dept", "type": "NVARCHAR(64)", "constraints": "NOT NULL"},
+            {"name": "kind", "type": "VARCHAR(2)", "constraints": "NOT NULL"}
+        ],
+        "primary_key": ["message_id", "dept"],
+        "foreign_keys": [
+            {"column": "message_id", "references": "messages(id)", "on_delete": "CASCADE"}
+        ],
+        "indexes": [
+            {"name": "idx_msgdept_dept_kind", "columns": ["dept", "kind", "message_id"]}
         ]
     }
 }
@@ -1,6 +1,7 @@
 import logging
 from src.db_scripts.db_init import DB_SCHEMA, TASKS_TABLE_NAME, _qname
 from src.db_scripts.db_utility import get_db_connection, fetch_all_as_dict, fetch_one_as_dict
+from src.db_scripts.message_manager import sync_message_departments
 
 logger = logging.getLogger(__name__)
 
@@ -75,6 +76,21 @@ def get_task_messages(task_id: str) -> list:
         logger.error(f"get_task_messages failed: {e}")
         return []
 
+def get_task_message_departments(task_id: str) -> list:
+    """
+    Only id, departments and cc_departments of a task's messages (enough to diff an approval).
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            from src.db_scripts.db_init import TABLE_NAME
+            qname = _qname(DB_SCHEMA, TABLE_NAME)
+            cursor.execute(f"SELECT id, departments, cc_departments FROM {qname} WHERE task_id = ?", (task_id,))
+            return fetch_all_as_dict(cursor)
+    except Exception as e:
+        logger.error(f"get_task_message_departments failed: {e}")
+        return []
+
 def approve_task_transaction(task_id: str, messages_updates: list) -> bool:
     """
     Updates task status to 1 and updates multiple messages in a single transaction.
@@ -91,15 +107,25 @@ def approve_task_transaction(task_id: str, messages_updates: list) -> bool:
             tasks_qname = _qname(DB_SCHEMA, TASKS_TABLE_NAME)
             cursor.execute(f"UPDATE {tasks_qname} SET status = 1 WHERE task_id = ?", (task_id,))
             
-            # 2. Update Messages (departments and cc_departments only)
+            # 2. Update Messages (departments and cc_departments only):
+            #    one parameter-array insert into a temp table, then one joined UPDATE
             msg_qname = _qname(DB_SCHEMA, TABLE_NAME)
-            for update in messages_updates:
-                dept_json = json.dumps(update['departments'])
-                cc_dept_json = json.dumps(update['cc_departments'])
-                cursor.execute(
-                    f"UPDATE {msg_qname} SET departments = ?, cc_departments = ? WHERE id = ?",
-                    (dept_json, cc_dept_json, update['id'])
-                )
+            rows = [(update['id'], json.dumps(update['departments']), json.dumps(update['cc_departments']))
+                    for update in messages_updates]
+            if rows:
+                # Session temp table; pooled connections are reused, so drop any leftover first
+                cursor.execute("""
+                    IF OBJECT_ID('tempdb..#approve_staging') IS NOT NULL DROP TABLE #approve_staging;
+                    CREATE TABLE #approve_staging (id INT PRIMARY KEY, departments NVARCHAR(MAX), cc_departments NVARCHAR(MAX))
+                """)
+                cursor.executemany(
+                    "INSERT INTO #approve_staging (id, departments, cc_departments) VALUES (?, ?, ?)", rows)
+                cursor.execute(f"""
+                    UPDATE m SET departments = s.departments, cc_departments = s.cc_departments
+                    FROM {msg_qname} m JOIN #approve_staging s ON m.id = s.id
+                """)
+                cursor.execute("DROP TABLE #approve_staging")
+            sync_message_departments(cursor, "m.task_id = ?", (task_id,))
             
             conn.commit()
             return True
@@ -5,4 +5,5 @@ from .gen_result_table import gen_result_table, no_polling_wrapper, polling_wrap
 from .gen_db_table import gen_datatable,gen_saved_label
 from .gen_db_lookup import gen_looked
 from .gen_root import gen_htmx_root
-from .gen_knowledge import gen_knowledge_page, gen_department_list, gen_editor
+from .gen_knowledge import gen_knowledge_page, gen_department_list, gen_editor, gen_reclassify_report
+from .gen_llm_metrics import gen_llm_metrics_summary
@@ -18,6 +18,7 @@ def gen_checkbox_table(task_id,anns :list,seleted_only: bool=False):
             _ = _input_ann_checker(ann)
             date_elem = f"<a>{ann.get(AnnKey.DATE.value)}</a>"
             linked_title_elem = f'<a href="{ann.get(AnnKey.LINK.value)}" target="_blank">{ann.get(AnnKey.TITLE.value)}</a>'
+            linked_title_elem += _duplicate_badge(ann, anns)
             if ann.setdefault(AnnKey.SELECTED.value,False) :
                 checked_str = f'<input name=id-{idx} id=annid-{idx} type=checkbox checked>'
                 sub_table_text +=(f"<li>{checked_str}&nbsp;{date_elem}&nbsp;{linked_title_elem}</li>")
@@ -56,6 +57,7 @@ def gen_no_checkbox_table(task_id,anns :list,polling: bool=True,seleted_only: bo
             if not seleted_only or ann.get(AnnKey.SELECTED.value,True): 
                 date_elem = f"<a>{ann.get(AnnKey.DATE.value)}</a>"
                 linked_title_elem = f'<a href="{ann.get(AnnKey.LINK.value)}" target="_blank">{ann.get(AnnKey.TITLE.value)}</a>'
+                linked_title_elem += _duplicate_badge(ann, anns)
                 sub_table_text += f"<li>{date_elem}&nbsp;{linked_title_elem}</li>"
             ann_count += 1
         detail_start = f'<details open><summary>{cl.DISPLAY_NAME} - {ann_count} 筆資料</summary>'
@@ -64,6 +66,15 @@ def gen_no_checkbox_table(task_id,anns :list,polling: bool=True,seleted_only: bo
     return table_container.format(task_id=task_id, table_text=table_text,
                                   STEP2_ANN_STATUS=URLS.STEP2_ANN_STATUS.value,
                                   TASK_ID_KEY=TasksKey.TASK_ID.value)
+def _duplicate_badge(ann: dict, anns: list) -> str:
+    # near-duplicate of another announcement (step 3 reuses that one's result)
+    rep_idx = ann.get(AnnKey.DUPLICATE_OF.value)
+    if rep_idx is None or not 0 <= rep_idx < len(anns):
+        return ''
+    rep = anns[rep_idx]
+    rep_site = getattr(rep.get(AnnKey.CRAWLER.value), 'DISPLAY_NAME', '')
+    return (f'&nbsp;<span class="dup-badge" title="{rep.get(AnnKey.TITLE.value)}">'
+            f'(與 {rep_site} 公告重複，沿用其分類)</span>')
 def _input_ann_checker(ann :dict) -> bool:
     try:# assert isinstance(ann, dict)
         assert AnnKey.DATE.value in ann
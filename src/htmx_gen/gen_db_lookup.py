@@ -1,11 +1,12 @@
+from urllib.parse import urlencode
 
-from src.string_management import TasksKey, AnnKey
+from src.string_management import TasksKey, AnnKey, URLS
 
 
-def gen_looked(ann_list):
+def _looked_rows(ann_list, next_query=None):
+    '''rows of one page; the last row loads the next page when scrolled into view'''
     tr_list = []
-    ann_list_sorted = sorted(ann_list, key=lambda x: x.get(AnnKey.DATE.value), reverse=True)
-    for ann in ann_list_sorted:
+    for ann in ann_list:
         tr = f"""
         <tr>
             <td>{ann.get(AnnKey.DATE.value)}</td>
@@ -15,7 +16,54 @@ def gen_looked(ann_list):
         </tr>
         """
         tr_list.append(tr)
+    if next_query:
+        tr_list.append(f"""
+        <tr hx-get="{URLS.LOOKUP_DB.value}?{urlencode(next_query)}"
+            hx-trigger="revealed" hx-swap="outerHTML">
+            <td colspan="4">載入中...</td>
+        </tr>
+        """)
+    return "".join(tr_list)
+
+
+def _lookup_filter_form(filters, departments, sites):
+    filters = filters or {}
+    site_options = ['<option value="">全部網站</option>']
+    for site in sites or []:
+        selected = ' selected' if site == filters.get('site') else ''
+        site_options.append(f'<option value="{site}"{selected}>{site}</option>')
+    dept_options = ['<option value="">全部部門</option>']
+    for dept in departments or []:
+        selected = ' selected' if dept == filters.get('department') else ''
+        dept_options.append(f'<option value="{dept}"{selected}>{dept}</option>')
+    sended_options = []
+    for value, label in (('1', '已寄送'), ('0', '未寄送'), ('', '全部')):
+        selected = ' selected' if value == filters.get('sended', '1') else ''
+        sended_options.append(f'<option value="{value}"{selected}>{label}</option>')
+    return f"""
+    <form id="db_lookup_filter" hx-get="{URLS.LOOKUP_DB.value}" hx-target="#main-container" hx-swap="innerHTML">
+        <label>起<input type="date" name="date_from" value="{filters.get('date_from') or ''}"></label>
+        <label>迄<input type="date" name="date_to" value="{filters.get('date_to') or ''}"></label>
+        <label>網站<select name="site">{"".join(site_options)}</select></label>
+        <label>部門<select name="department">{"".join(dept_options)}</select></label>
+        <label>狀態<select name="sended">{"".join(sended_options)}</select></label>
+        <button type="submit">篩選</button>
+    </form>
+    """
+
+
+def gen_looked(ann_list, next_query=None, rows_only=False, filters=None, departments=None, sites=None):
+    '''
+    ann_list: one page of messages, newest first
+    next_query: dict, query string of the next page (None on the last page)
+    rows_only: only the rows, for the infinite scroll requests after the first page
+    filters / departments / sites: current filter values, department and site options of the filter form
+    '''
+    rows = _looked_rows(ann_list, next_query)
+    if rows_only:
+        return rows
     looed_wrapper = f"""
+    {_lookup_filter_form(filters, departments, sites)}
     <table id="db_looked_table" class="lookup_table">
         <caption>
             <thead>
@@ -25,7 +73,7 @@ def gen_looked(ann_list):
                     <th>主旨</th>
                     <th>相關部門</th></tr></thead>
             <tbody>
-            {"".join(tr_list)}
+            {rows}
             </tbody>
         </caption>
     </table>
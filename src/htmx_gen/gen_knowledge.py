@@ -42,6 +42,12 @@ def gen_editor(dept_name, content):
         <button type="submit" style="padding: 10px 20px; cursor: pointer;">Save Changes</button>
         <span id="save-status"></span>
     </form>
+    <div style="margin-top: 10px;">
+        <button hx-get="{URLS.KNOWLEDGE_RECLASSIFY_REPORT}?dept_name={dept_name}"
+                hx-target="#reclassify-report" hx-swap="innerHTML"
+                style="padding: 5px 10px; cursor: pointer;">重新分類影響 (Re-classification diff)</button>
+        <div id="reclassify-report"></div>
+    </div>
     <script>
         document.body.addEventListener('htmx:afterRequest', function(evt) {{
             if(evt.detail.elt.tagName === 'FORM') {{
@@ -58,3 +64,31 @@ def gen_editor(dept_name, content):
         }});
     </script>
     '''
+
+
+def gen_reclassify_report(dept_name, report):
+    """
+    report: output of reclassify.reclassify_department, None if the department was never re-classified
+    """
+    if not report:
+        return f'<p>{dept_name}: 尚無重新分類報告 (no report yet).</p>'
+    rows = ''
+    for flip in report.get('flips', []):
+        change = '<span style="color: green;">+ 新增</span>' if flip['change'] == 'added' else '<span style="color: red;">- 移除</span>'
+        rows += f'''
+        <tr>
+            <td>{change}</td>
+            <td><a href="{flip.get('link')}" target="_blank">{flip.get('title')}</a></td>
+            <td>{flip.get('old')}</td>
+            <td>{flip.get('task_id')}</td>
+        </tr>
+        '''
+    return f'''
+    <p><b>{dept_name}</b> ({report.get('source')}, {report.get('scope')}) @ {report.get('created_at')}:
+        {report.get('messages')} 筆, +{report.get('added')} / -{report.get('removed')},
+        未判定 {len(report.get('unknown', []))}</p>
+    <table class="lookup_table">
+        <thead><tr><th>變動</th><th>主旨</th><th>原狀態</th><th>任務</th></tr></thead>
+        <tbody>{rows}</tbody>
+    </table>
+    '''
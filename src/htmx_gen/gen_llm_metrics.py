@@ -0,0 +1,13 @@
+
+def gen_llm_metrics_summary(metrics: dict) -> str:
+    # metrics: output of llm_metrics.get_task_metrics, empty when no LLM call was made
+    total = metrics.get('total')
+    if not total:
+        return ''
+    return f"""
+    <div class="llm-metrics" style="margin: 5px 0; color: #555; font-size: 0.9em;">
+        LLM: {total['calls']} 次呼叫 (失敗 {total['failed']}, 重試 {total['retries']}, 429: {total['rate_limited']})
+        | tokens {total['input_tokens']} / {total['output_tokens']}
+        | 延遲 p50 {total['latency_p50']:.1f}s, p95 {total['latency_p95']:.1f}s
+        | 成本 ${total['cost']:.4f}
+    </div>"""
@@ -3,11 +3,20 @@ import logging
 
 from src.utils.department_provider import get_department_names
 from src.htmx_gen import gen_email_link
-from src.string_management import URLS, TasksKey, AnnKey
+from src.string_management import URLS, TasksKey, AnnKey, AnnStage
 
 # Load department list (will raise on JSON errors or missing file)
 department_list = get_department_names()
 id_em_elem_template = 'email_link_annid-{ann_idx}'
+# step 3 pipeline stage shown per announcement (finished ones show nothing)
+stage_labels = {
+    AnnStage.QUEUED: '(排隊中)',
+    AnnStage.PARSING: '(讀取中)',
+    AnnStage.EXTRACTING: '(解析附件中)',
+    AnnStage.CLASSIFYING: '(分類中)',
+    AnnStage.DUPLICATE: '(等待重複公告結果)',
+    AnnStage.FAILED: '(處理失敗)',
+}
 polling_wrapper = """<div id="result_table"
     hx-get="{STEP3_RESULT_STATUS}?{TASK_ID_KEY}={tasks_id}"
         hx-trigger="every 1s"
@@ -41,8 +50,10 @@ def gen_result_table(table_container,tasks_id,ann_list):
                                 STEP3_RESULT_STATUS=URLS.STEP3_RESULT_STATUS.value,
                                 TASK_ID_KEY=TasksKey.TASK_ID.value)
 def _gen_inner_table(tasks_id,ann):
+    ann_stage = ann.get(AnnKey.STAGE.value)
     if ann.get(AnnKey.CONTENT.value) is None:
-        return "<div class='waitingrror'>Announcement data is incomplete.</div>"
+        stage_text = stage_labels.get(ann_stage, '')
+        return f"<div class='waitingrror'>Announcement data is incomplete. {stage_text} {ann.get(AnnKey.TITLE.value,'')}</div>"
     if not ann_integrity_check(ann):
         # logging.error(f"Announcement integrity check failed for announcement: {ann}")
         return "<div class='error'>error</div>"
@@ -51,6 +62,7 @@ def _gen_inner_table(tasks_id,ann):
     ann_attachment_list = ann.get(AnnKey.ATTACHMENTS.value,[])
     ann_department_list = ann.get(AnnKey.DEPARTMENTS.value,[])
     ann_cc_department_list = ann.setdefault(AnnKey.CC_DEPARTMENTS.value,[])
+    ann_unknown_department_list = ann.get(AnnKey.UNKNOWN_DEPARTMENTS.value,[])
     ann_title = ann.get(AnnKey.TITLE.value,'')
     ann_link = ann.get(AnnKey.LINK.value,'')
     ann_content = ann.get(AnnKey.CONTENT.value,'')
@@ -67,12 +79,13 @@ def _gen_inner_table(tasks_id,ann):
             <div class="date-cell">{ann_date}</div>
             <div class="subject-cell">{subject_html}</div>
             <div class="attachment-cell">{attachment_html}</div>
+            <div class="stage-cell">{stage_labels.get(ann_stage, '')}</div>
         </div>
         
         <!-- 內容列 -->
         <div class="content-row">
             <div class="departments-cell">
-                {_gen_checkbox_dept_options(tasks_id,ann_idx,ann_department_list,ann_cc_department_list)}
+                {_gen_checkbox_dept_options(tasks_id,ann_idx,ann_department_list,ann_cc_department_list,ann_unknown_department_list)}
             </div>
 
         </div>
@@ -82,7 +95,7 @@ def _gen_inner_table(tasks_id,ann):
             #     {email_elem}
             # </div>
 
-def _gen_checkbox_dept_options(task_id,ann_idx,dept_set,cc_set):
+def _gen_checkbox_dept_options(task_id,ann_idx,dept_set,cc_set,unknown_set=()):
     patch_wrapper = """<form hx-patch="{STEP3_RESULT_DEPT_SELECT}?{TASK_ID_KEY}={task_id}" 
         hx-trigger="change"
         hx-target="#{id_em_elem}"
@@ -94,11 +107,12 @@ def _gen_checkbox_dept_options(task_id,ann_idx,dept_set,cc_set):
         to_checked = 'checked' if dept_name in dept_set else ''
         cc_checked = 'checked' if dept_name in cc_set else ''
         checked_attr = 'checked' if cc_checked or to_checked else ''
+        unknown_mark = '<span class="dept-unknown" style="color: orange;">(未判定)</span>' if dept_name in unknown_set else ''
         option_html = f'''
         <div class="dept-option">
             <input type="checkbox" name="dept_option_{dept_idx}" 
                 value="ann_idx:{ann_idx} dept_idx:{dept_idx} type:outter" {checked_attr}> 
-            <label>{dept_name}</label>
+            <label>{dept_name}</label>{unknown_mark}
             <div class="recipient-type" style="margin-left: 20px; {'display: inline-block;'}">
                 <input type="radio" name="dept_type_{dept_idx}" id="to_{dept_idx}" 
                     value="ann_idx:{ann_idx} dept_idx:{dept_idx} type:to" {to_checked}>
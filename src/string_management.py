@@ -48,10 +48,12 @@ class URLS(StrEnum):
     KNOWLEDGE_LIST = _nginx_location+"/knowledge_list"
     KNOWLEDGE_CONTENT = _nginx_location+"/knowledge_content"
     KNOWLEDGE_SAVE = _nginx_location+"/knowledge_save"
+    KNOWLEDGE_RECLASSIFY_REPORT = _nginx_location+"/knowledge_reclassify_report"
 
     # Utilities
     HEARTBEAT = _nginx_location+"/heartbeat"
     SERVER_STATUS = _nginx_location+"/server_status"
+    LLM_METRICS = _nginx_location+"/llm_metrics"
     ANN_CHECKBOX_SET = _nginx_location+"/ann_checkbox_set"
 
 class AnnKey(StrEnum):
@@ -66,8 +68,11 @@ class AnnKey(StrEnum):
     ATTACHMENTS = "attachments"
     DEPARTMENTS = "departments"
     CC_DEPARTMENTS = "cc_departments"
+    UNKNOWN_DEPARTMENTS = "unknown_departments"
     LOOKED = "looked"
     SENDED = "sended"
+    STAGE = "stage"
+    DUPLICATE_OF = "duplicate_of"
 
 class Announcement(TypedDict):
     """Announcement dictionary structure"""
@@ -81,8 +86,21 @@ class Announcement(TypedDict):
     attachments: Optional[List[str]]
     departments: Optional[List[str]]
     cc_departments: Optional[List[str]]
+    unknown_departments: Optional[List[str]]
     looked: Optional[bool]
     sended: Optional[bool]
+    stage: Optional[str]
+    duplicate_of: Optional[int] # index of the cluster representative
+
+class AnnStage(StrEnum):
+    """Per-announcement progress through the step 3 pipeline"""
+    QUEUED = "queued"
+    PARSING = "parsing"
+    EXTRACTING = "extracting"
+    CLASSIFYING = "classifying"
+    DUPLICATE = "duplicate" # waiting for its near-duplicate representative
+    DONE = "done"
+    FAILED = "failed"
 
 class TasksKey(StrEnum):
     """Task dictionary keys"""
@@ -0,0 +1,246 @@
+"""
+Classification accuracy-and-throughput benchmark built from approved history.
+
+1. Freeze the human-approved routing into an evaluation set:
+    python -m src.tools.classification_benchmark export eval_set.jsonl
+2. Run a classifier over it and write a report:
+    python -m src.tools.classification_benchmark run eval_set.jsonl --classifier cascade -o cascade.json
+3. Gate a change on not regressing a previous report (exit code 1 on regression):
+    python -m src.tools.classification_benchmark run eval_set.jsonl --classifier cascade --baseline cascade.json
+
+A message counts as positive for every department in departments or
+cc_departments. Content goes through the same boilerplate stripping as step 3
+(use --no-boilerplate to compare), and the report shows the token reduction
+per site. New classifiers only need an entry in CLASSIFIERS, an async
+callable (title, content, appendix_texts) -> (departments, unknown).
+"""
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import datetime
+import importlib
+import logging
+from collections import Counter
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# name -> "module:function" of a classify_text_detail-compatible coroutine
+CLASSIFIERS = {
+    'rule': 'src.classifier.rule_based_classifier:classify_text_detail',
+    'llm': 'src.classifier.llm_based_classifier:classify_text_detail',
+    'cascade': 'src.classifier.cascade_classifier:classify_text_detail',
+}
+
+
+def _load_classifier(name: str):
+    module_name, func_name = CLASSIFIERS[name].split(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def item_site(item: dict) -> str:
+    '''boilerplate profile key of an item: the stored site name, else the link's host'''
+    return item.get('site') or urlparse(item.get('link') or '').netloc
+
+
+def export_eval_set(path: str) -> dict:
+    '''write approved messages to a frozen JSONL evaluation set, return its manifest'''
+    from src.db_scripts.message_manager import get_approved_messages
+    items = []
+    for msg in get_approved_messages():
+        date = msg.get('date')
+        items.append({
+            'id': msg.get('id'),
+            'title': msg.get('title') or '',
+            'content': msg.get('content') or '',
+            'site': msg.get('displaySiteName') or '',
+            'link': msg.get('link') or '',
+            'date': date.strftime('%Y-%m-%d') if isinstance(date, datetime.date) else date,
+            'departments': sorted(msg.get('departments') or []),
+            'cc_departments': sorted(msg.get('cc_departments') or []),
+        })
+    lines = [json.dumps(item, ensure_ascii=False, sort_keys=True) for item in items]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + ('\n' if lines else ''))
+    return {'path': path, 'items': len(items), 'sha256': hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()}
+
+
+def load_eval_set(path: str) -> list[dict]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def expected_departments(item: dict) -> set:
+    return set(item.get('departments') or []) | set(item.get('cc_departments') or [])
+
+
+def score(items: list[dict], predictions: list[set]) -> dict:
+    '''per-department and micro precision/recall/F1'''
+    tp, fp, fn = Counter(), Counter(), Counter()
+    for item, predicted in zip(items, predictions):
+        expected = expected_departments(item)
+        for dept in predicted & expected:
+            tp[dept] += 1
+        for dept in predicted - expected:
+            fp[dept] += 1
+        for dept in expected - predicted:
+            fn[dept] += 1
+
+    def _prf(t, p, n):
+        precision = t / (t + p) if t + p else 0.0
+        recall = t / (t + n) if t + n else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {'precision': round(precision, 4), 'recall': round(recall, 4), 'f1': round(f1, 4),
+                'tp': t, 'fp': p, 'fn': n, 'support': t + n}
+
+    departments = sorted(set(tp) | set(fp) | set(fn))
+    return {
+        'micro': _prf(sum(tp.values()), sum(fp.values()), sum(fn.values())),
+        'departments': {dept: _prf(tp[dept], fp[dept], fn[dept]) for dept in departments},
+    }
+
+
+def strip_eval_boilerplate(items: list[dict]) -> tuple[list[str], dict]:
+    '''strip site boilerplate from every item's content
+    Sites without a learned profile yet learn one from the evaluation set itself.
+    Items without a site are left as they are: one profile over mixed sites
+    would strip lines the sites merely share.
+
+    return: (stripped contents in item order, {site: token reduction stats})
+    '''
+    from src.utils.boilerplate import BoilerplateProfile, BOILERPLATE_MIN_PAGES, get_profile
+    from src.classifier.LLM.llm_metrics import estimate_tokens
+    by_site: dict[str, list[int]] = {}
+    for i, item in enumerate(items):
+        by_site.setdefault(item_site(item), []).append(i)
+
+    contents = [item['content'] for item in items]
+    report = {}
+    for site, indices in by_site.items():
+        if not site:
+            report[''] = {'items': len(indices), 'learned_from': 'none (no site)'}
+            continue
+        profile = get_profile(site)
+        learned_from = 'profile'
+        if profile.pages < BOILERPLATE_MIN_PAGES:
+            profile = BoilerplateProfile(site)
+            for i in indices:
+                profile.observe(items[i]['content'], items[i].get('link') or None)
+            learned_from = 'eval_set'
+        before = after = 0
+        for i in indices:
+            contents[i] = profile.strip(items[i]['content'])
+            before += estimate_tokens(items[i]['content'])
+            after += estimate_tokens(contents[i])
+        report[site] = {
+            'items': len(indices),
+            'learned_from': learned_from,
+            'tokens_before': before,
+            'tokens_after': after,
+            'reduction': round(1 - after / before, 4) if before else 0.0,
+        }
+    return contents, report
+
+
+async def run_benchmark(items: list[dict], classifier_name: str, concurrency: int = 4,
+                        strip_boilerplate: bool = True) -> dict:
+    from src.classifier.LLM import llm_metrics
+    classify = _load_classifier(classifier_name)
+    if strip_boilerplate:
+        contents, boilerplate_report = strip_eval_boilerplate(items)
+    else:
+        contents, boilerplate_report = [item['content'] for item in items], {}
+    semaphore = asyncio.Semaphore(concurrency)
+    predictions: list[set] = [set() for _ in items]
+    unknown = Counter()
+
+    async def one(i: int, item: dict):
+        async with semaphore:
+            try:
+                depts, unknown_depts = await classify(item['title'], contents[i], {})
+                predictions[i] = set(depts)
+                unknown.update(unknown_depts)
+            except Exception as e:
+                logger.error(f"Benchmark item {item.get('id')} failed: {e}")
+
+    llm_metrics.reset()
+    start = time.monotonic()
+    await asyncio.gather(*[one(i, item) for i, item in enumerate(items)])
+    elapsed = time.monotonic() - start
+    llm_total = llm_metrics.snapshot()['total']
+
+    report = {
+        'classifier': classifier_name,
+        'items': len(items),
+        'elapsed_s': round(elapsed, 3),
+        'items_per_s': round(len(items) / elapsed, 3) if elapsed else 0.0,
+        'llm_calls': llm_total['calls'],
+        'llm_calls_per_item': round(llm_total['calls'] / len(items), 3) if items else 0.0,
+        'input_tokens': llm_total['input_tokens'],
+        'output_tokens': llm_total['output_tokens'],
+        'cost': llm_total['cost'],
+        'cost_per_item': round(llm_total['cost'] / len(items), 6) if items else 0.0,
+        'unknown': dict(unknown),
+        'boilerplate': boilerplate_report,
+        **score(items, predictions),
+    }
+    if classifier_name == 'cascade':
+        from src.classifier.cascade_classifier import get_cascade_stats
+        report['cascade'] = get_cascade_stats()
+    return report
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float = 0.01) -> list[str]:
+    '''quality drops beyond tolerance compared with a baseline report'''
+    regressions = []
+    for metric in ('precision', 'recall', 'f1'):
+        old, new = baseline['micro'][metric], report['micro'][metric]
+        if new < old - tolerance:
+            regressions.append(f"micro {metric} {old:.4f} -> {new:.4f}")
+    for dept, old_scores in baseline.get('departments', {}).items():
+        new_scores = report['departments'].get(dept)
+        if old_scores['support'] and new_scores is not None and new_scores['recall'] < old_scores['recall'] - tolerance:
+            regressions.append(f"{dept} recall {old_scores['recall']:.4f} -> {new_scores['recall']:.4f}")
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Classification accuracy-and-throughput benchmark")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export_p = sub.add_parser('export', help="freeze approved messages into an evaluation set")
+    export_p.add_argument('path')
+    run_p = sub.add_parser('run', help="run a classifier over an evaluation set")
+    run_p.add_argument('path')
+    run_p.add_argument('--classifier', choices=sorted(CLASSIFIERS), default='rule')
+    run_p.add_argument('--concurrency', type=int, default=4)
+    run_p.add_argument('-o', '--output', help="write the report to this JSON file")
+    run_p.add_argument('--baseline', help="previous report; exit 1 if quality regressed")
+    run_p.add_argument('--tolerance', type=float, default=0.01)
+    run_p.add_argument('--no-boilerplate', dest='boilerplate', action='store_false',
+                       help="classify raw content without boilerplate stripping")
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        print(json.dumps(export_eval_set(args.path), ensure_ascii=False, indent=2))
+        return 0
+
+    report = asyncio.run(run_benchmark(load_eval_set(args.path), args.classifier, args.concurrency, args.boilerplate))
+    print(json.dumps({k: v for k, v in report.items() if k != 'departments'}, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Load driver for the LLM department classifier.
+
+Replays N announcements through llm_based_classifier.classify_dept at a
+configurable concurrency and reports throughput, p50/p99 latency and retry /
+429 behaviour. With --mock (default) a local mock server is started in-process
+and the classifier is pointed at it, so nothing leaves the machine.
+
+    python -m src.tools.llm_load_driver -n 200 -c 20 --rpm 300 --latency-median 1.5
+    python -m src.tools.llm_load_driver --no-mock --input eval_set.jsonl -n 50
+"""
+import json
+import time
+import asyncio
+import argparse
+import threading
+import logging
+
+import uvicorn
+
+from src.tools import mock_llm_server
+from src.classifier.LLM import langchain_compoment, llm_metrics
+from src.classifier.LLM.read_describe_to_decide_department import get_limiter_state
+import src.classifier.llm_based_classifier as llm_cls
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def load_announcements(path: str | None, n: int) -> list[dict]:
+    '''n announcements from a JSONL file (title/content per line), cycled; synthetic when no file'''
+    items = []
+    if path:
+        with open(path, encoding='utf-8') as f:
+            items = [json.loads(line) for line in f if line.strip()]
+    if not items:
+        items = [{'title': f'測試公告 {i}', 'content': f'金融監督管理委員會發布第 {i} 號函令，修正相關作業規定。'} for i in range(n)]
+    return [items[i % len(items)] for i in range(n)]
+
+
+def start_mock_server(settings: mock_llm_server.MockSettings, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(mock_llm_server.create_app(settings),
+                                           host='127.0.0.1', port=port, log_level='error'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Mock LLM server did not start")
+        time.sleep(0.05)
+    return server
+
+
+async def run_load(announcements: list[dict], concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(ann: dict):
+        async with semaphore:
+            start = time.monotonic()
+            await llm_cls.classify_dept(ann.get('title', ''), ann.get('content', ''), [])
+            latencies.append(time.monotonic() - start)
+
+    llm_metrics.reset()
+    start = time.monotonic()
+    await asyncio.gather(*[one(ann) for ann in announcements])
+    elapsed = time.monotonic() - start
+    calls = llm_metrics.snapshot()['total']
+    return {
+        'announcements': len(announcements),
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'announcements_per_s': round(len(announcements) / elapsed, 3) if elapsed else 0.0,
+        'calls_per_s': round(calls['calls'] / elapsed, 3) if elapsed else 0.0,
+        'announcement_latency_p50': round(_percentile(latencies, 0.50), 3),
+        'announcement_latency_p99': round(_percentile(latencies, 0.99), 3),
+        'llm_calls': calls,
+        'final_limiter': get_limiter_state(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the LLM department classifier")
+    parser.add_argument('-n', '--announcements', type=int, default=100)
+    parser.add_argument('-c', '--concurrency', type=int, default=10, help="announcements in flight")
+    parser.add_argument('--input', help="JSONL with title/content per line (e.g. an exported eval set)")
+    parser.add_argument('--mock', dest='mock', action='store_true', default=True)
+    parser.add_argument('--no-mock', dest='mock', action='store_false', help="use the configured endpoint")
+    parser.add_argument('--port', type=int, default=8900)
+    mock_llm_server.add_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.mock:
+        server = start_mock_server(mock_llm_server.settings_from_args(args), args.port)
+        langchain_compoment.configure_llm(api_key='mock', base_url=f'http://127.0.0.1:{args.port}/v1', model_name='mock')
+    try:
+        report = asyncio.run(run_load(load_announcements(args.input, args.announcements), args.concurrency))
+    finally:
+        if server is not None:
+            server.should_exit = True
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
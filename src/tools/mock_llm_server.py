@@ -0,0 +1,131 @@
+"""
+Local OpenAI-compatible stand-in for the classifier's LLM endpoint.
+
+Serves POST /v1/chat/completions with a configurable latency distribution,
+429 injection (random, in-flight cap, or requests-per-minute quota) and a
+deterministic "True"/"False" answer derived from the prompt, so load tests can
+run fully offline without spending provider quota.
+
+    python -m src.tools.mock_llm_server --port 8900 --latency-median 1.5 --rpm 300
+"""
+import time
+import math
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+import logging
+from collections import deque
+from dataclasses import dataclass
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MockSettings:
+    latency_median: float = 1.0      # seconds, median of the lognormal latency
+    latency_sigma: float = 0.5       # lognormal shape; 0 gives a constant latency
+    latency_max: float = 30.0        # latency cap
+    error_429_rate: float = 0.0      # probability of a random 429
+    max_inflight: int = 0            # 429 when more requests are in flight (0 = no cap)
+    rpm: int = 0                     # 429 above this many requests per 60 s (0 = no quota)
+    true_rate: float = 0.2           # share of prompts answered "True"
+    seed: int = 0
+
+
+def deterministic_answer(prompt: str, true_rate: float) -> bool:
+    '''same prompt -> same answer, about true_rate of prompts answer True'''
+    digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 2 ** 32 < true_rate
+
+
+def create_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(settings.seed)
+    state = {'inflight': 0, 'served': 0, 'rejected': 0}
+    window = deque()
+
+    def _rate_limited() -> bool:
+        now = time.monotonic()
+        while window and now - window[0] > 60:
+            window.popleft()
+        if settings.rpm and len(window) >= settings.rpm:
+            return True
+        if settings.max_inflight and state['inflight'] >= settings.max_inflight:
+            return True
+        if settings.error_429_rate and rng.random() < settings.error_429_rate:
+            return True
+        window.append(now)
+        return False
+
+    def _latency() -> float:
+        if settings.latency_sigma <= 0:
+            return settings.latency_median
+        return min(settings.latency_max, rng.lognormvariate(math.log(settings.latency_median), settings.latency_sigma))
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if _rate_limited():
+            state['rejected'] += 1
+            return JSONResponse(status_code=429, content={
+                "error": {"message": "Rate limit exceeded (mock)", "type": "rate_limit_error", "code": 429}})
+        state['inflight'] += 1
+        try:
+            await asyncio.sleep(_latency())
+        finally:
+            state['inflight'] -= 1
+        state['served'] += 1
+        prompt = "\n".join(str(m.get('content', '')) for m in body.get('messages', []))
+        answer = "True" if deterministic_answer(prompt, settings.true_rate) else "False"
+        prompt_tokens = max(1, len(prompt) // 2)
+        return {
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', 'mock'),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": answer}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 1,
+                      "total_tokens": prompt_tokens + 1},
+        }
+
+    @app.get("/mock/stats")
+    async def stats():
+        return {**state, 'window_requests': len(window)}
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    defaults = MockSettings()
+    parser.add_argument('--latency-median', type=float, default=defaults.latency_median)
+    parser.add_argument('--latency-sigma', type=float, default=defaults.latency_sigma)
+    parser.add_argument('--latency-max', type=float, default=defaults.latency_max)
+    parser.add_argument('--error-429-rate', type=float, default=defaults.error_429_rate)
+    parser.add_argument('--max-inflight', type=int, default=defaults.max_inflight)
+    parser.add_argument('--rpm', type=int, default=defaults.rpm)
+    parser.add_argument('--true-rate', type=float, default=defaults.true_rate)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(
+        latency_median=args.latency_median, latency_sigma=args.latency_sigma,
+        latency_max=args.latency_max, error_429_rate=args.error_429_rate,
+        max_inflight=args.max_inflight, rpm=args.rpm,
+        true_rate=args.true_rate, seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock LLM server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level='error')
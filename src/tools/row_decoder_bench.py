@@ -0,0 +1,109 @@
+"""
+Microbenchmark of row materialization: the former per-row row_to_dict
+against the compiled RowDecoder (dicts and records), over synthetic rows
+shaped like a `SELECT *` on messages. Needs no database.
+
+    python -m src.tools.row_decoder_bench --rows 10000 --repeat 5
+"""
+import json
+import time
+import argparse
+import datetime
+
+from src.db_scripts.row_decoder import RowDecoder
+
+# Column order of messages in TABLE_DEFINITIONS
+_COLUMNS = ('id', 'title', 'date', 'link', 'departments', 'cc_departments', 'looked', 'sended',
+            'title_hash', 'datetime', 'documentNumber', 'displaySiteName', 'content', 'task_id',
+            'attachments', 'link_hash')
+
+
+class _FakeCursor:
+    def __init__(self, columns):
+        self.description = [(name, None, None, None, None, None, None) for name in columns]
+
+
+def _legacy_row_to_dict(cursor, row) -> dict:
+    # row_to_dict before the RowDecoder, kept here as the baseline
+    if not row:
+        return {}
+    columns = [column[0] for column in cursor.description]
+    result = dict(zip(columns, row))
+
+    def find_key(target):
+        for k in result:
+            if k.lower() == target.lower():
+                return k
+        return None
+
+    for field in ['departments', 'cc_departments', 'attachments']:
+        key = find_key(field)
+        if key:
+            val = result[key]
+            if isinstance(val, str) and val.strip():
+                try:
+                    result[key] = json.loads(val)
+                except Exception:
+                    if field == 'attachments':
+                        result[key] = [s.strip() for s in str(val).split(',') if s.strip()]
+                    else:
+                        result[key] = []
+            elif val is None:
+                result[key] = []
+    date_key = find_key('date')
+    if date_key:
+        val = result[date_key]
+        if isinstance(val, datetime.datetime):
+            result[date_key] = val.strftime('%Y-%m-%d')
+    return result
+
+
+def make_rows(count: int) -> list[tuple]:
+    base = datetime.datetime(2026, 1, 1)
+    rows = []
+    for i in range(count):
+        rows.append((
+            i, f'公告標題 {i}', base + datetime.timedelta(days=i % 60), f'https://example.org/{i}',
+            json.dumps(['法遵部', '風險管理部'][: i % 3]), json.dumps(['資訊部'] if i % 2 else []),
+            True, bool(i % 2), 'a' * 64, base, f'No.{i}', '金管會', '內容' * 20, f'task-{i % 50}',
+            json.dumps([f'file_{i}.pdf']) if i % 4 else None, 'B' * 64,
+        ))
+    return rows
+
+
+def _best_of(repeat: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(rows: int = 10000, repeat: int = 5) -> dict:
+    cursor = _FakeCursor(_COLUMNS)
+    data = make_rows(rows)
+    decoder = RowDecoder.from_description(cursor.description)
+    assert [_legacy_row_to_dict(cursor, row) for row in data] == decoder.decode_all(data)
+    return {
+        'rows': rows,
+        'legacy_dict_s': _best_of(repeat, lambda: [_legacy_row_to_dict(cursor, row) for row in data]),
+        'decoder_dict_s': _best_of(repeat, lambda: decoder.decode_all(data)),
+        'decoder_record_s': _best_of(repeat, lambda: decoder.decode_all(data, record=True)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row materialization")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    result = run_benchmark(args.rows, args.repeat)
+    legacy = result['legacy_dict_s']
+    print(f"{result['rows']} rows, best of {args.repeat}")
+    for key in ('legacy_dict_s', 'decoder_dict_s', 'decoder_record_s'):
+        print(f"  {key:<18} {result[key] * 1000:8.1f} ms  x{legacy / result[key]:.2f}")
+
+
+if __name__ == '__main__':
+    main()
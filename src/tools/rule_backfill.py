@@ -0,0 +1,59 @@
+"""
+Offline backfill with the rule classifier's batch API.
+
+Runs classify_many over stored messages (cached extracted text when present)
+and writes one JSON line per message with the rule departments and the
+matched keywords behind each of them.
+
+    python -m src.tools.rule_backfill backfill.jsonl --scope recent --days 60 --workers 4
+"""
+import json
+import time
+import argparse
+import logging
+
+from src.classifier.rule_based_classifier import classify_many
+from src.db_scripts.message_manager import get_messages_for_reclassify
+from src.utils.text_cache import load_extracted_text
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rule-classify stored messages in batch")
+    parser.add_argument('output')
+    parser.add_argument('--scope', choices=['pending', 'recent'], default='recent')
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    messages = get_messages_for_reclassify(args.scope, args.days)
+    items = []
+    for msg in messages:
+        cached = load_extracted_text(msg.get('link')) or {}
+        items.append({
+            'title': cached.get('title') or msg.get('title') or '',
+            'content': cached.get('content') or msg.get('content') or '',
+            'appendix_texts': cached.get('appendix_texts') or {},
+        })
+
+    start = time.monotonic()
+    results = classify_many(items, workers=args.workers)
+    elapsed = time.monotonic() - start
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for msg, result in zip(messages, results):
+            stored = set(msg.get('departments') or []) | set(msg.get('cc_departments') or [])
+            f.write(json.dumps({
+                'id': msg.get('id'),
+                'title': msg.get('title'),
+                'departments': sorted(result['departments']),
+                'evidence': {dept: sorted(kws) for dept, kws in result['evidence'].items()},
+                'missing_vs_stored': sorted(stored - result['departments']),
+                'extra_vs_stored': sorted(result['departments'] - stored),
+            }, ensure_ascii=False) + '\n')
+    print(f"{len(items)} messages in {elapsed:.2f}s ({len(items) / elapsed if elapsed else 0:.1f}/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import logging
+import configparser
+
+logger = logging.getLogger(__name__)
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+BOILERPLATE_ENABLED = config.getint('Boilerplate', 'enabled', fallback=1) == 1
+BOILERPLATE_PATH = config.get('Outputdir', 'BOILERPLATE_PATH', fallback='./boilerplate_profiles')
+# A line is boilerplate once it was seen on at least min_pages pages and on
+# at least min_ratio of all pages observed for that site
+BOILERPLATE_MIN_PAGES = config.getint('Boilerplate', 'min_pages', fallback=5)
+BOILERPLATE_MIN_RATIO = config.getfloat('Boilerplate', 'min_ratio', fallback=0.3)
+# Shorter lines are kept: section labels such as 主旨： recur but carry structure
+BOILERPLATE_MIN_LINE_CHARS = config.getint('Boilerplate', 'min_line_chars', fallback=4)
+_MAX_TRACKED_LINES = 5000
+# Pages already counted per site; re-crawls of overlapping date ranges must not count twice
+_MAX_TRACKED_PAGES = 20000
+
+_space_re = re.compile(r'\s+')
+
+
+def _line_key(line: str) -> str | None:
+    line = _space_re.sub(' ', line).strip()
+    if len(line) < BOILERPLATE_MIN_LINE_CHARS:
+        return None
+    return hashlib.blake2b(line.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _page_key(text: str, page_key: str | None = None) -> str:
+    source = page_key if page_key else _space_re.sub(' ', text or '').strip()
+    return hashlib.blake2b(source.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class BoilerplateProfile:
+    """Line frequencies across the pages of one site."""
+
+    def __init__(self, site: str, pages: int = 0, line_counts: dict | None = None, seen_pages: list | None = None):
+        self.site = site
+        self.pages = pages
+        self.line_counts: dict[str, int] = dict(line_counts or {})
+        # Insertion-ordered, so the oldest keys are forgotten first
+        self.seen_pages: dict[str, None] = dict.fromkeys(seen_pages or [])
+
+    def observe(self, text: str, page_key: str | None = None) -> bool:
+        """Count each distinct line of one page, once per page.
+
+        Args:
+            text (str): Page content.
+            page_key (str): Stable page identity, e.g. its link; defaults to the content itself.
+
+        Returns:
+            bool: False when the page had already been counted.
+        """
+        key = _page_key(text, page_key)
+        if key in self.seen_pages:
+            return False
+        self.seen_pages[key] = None
+        if len(self.seen_pages) > _MAX_TRACKED_PAGES:
+            del self.seen_pages[next(iter(self.seen_pages))]
+        self.pages += 1
+        for key in {_line_key(line) for line in (text or '').splitlines()} - {None}:
+            self.line_counts[key] = self.line_counts.get(key, 0) + 1
+        if len(self.line_counts) > _MAX_TRACKED_LINES:
+            # Forget lines seen only once, they are page content
+            self.line_counts = {k: v for k, v in self.line_counts.items() if v > 1}
+        return True
+
+    def is_boilerplate(self, line: str) -> bool:
+        key = _line_key(line)
+        if key is None or self.pages < BOILERPLATE_MIN_PAGES:
+            return False
+        count = self.line_counts.get(key, 0)
+        return count >= BOILERPLATE_MIN_PAGES and count >= BOILERPLATE_MIN_RATIO * self.pages
+
+    def strip(self, text: str) -> str:
+        """Remove learned boilerplate lines from text."""
+        if not text or self.pages < BOILERPLATE_MIN_PAGES:
+            return text or ''
+        return '\n'.join(line for line in text.splitlines() if not self.is_boilerplate(line))
+
+    def to_dict(self) -> dict:
+        return {'site': self.site, 'pages': self.pages, 'line_counts': self.line_counts,
+                'seen_pages': list(self.seen_pages)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BoilerplateProfile':
+        return cls(data.get('site', ''), data.get('pages', 0), data.get('line_counts'), data.get('seen_pages'))
+
+
+_profiles: dict[str, BoilerplateProfile] = {}
+_lock = threading.Lock()
+
+
+def _profile_file(site: str) -> str:
+    return os.path.join(BOILERPLATE_PATH, hashlib.sha256(site.encode('utf-8')).hexdigest()[:16] + '.json')
+
+
+def get_profile(site: str) -> BoilerplateProfile:
+    """Cached profile of a site, loaded from disk on first use."""
+    with _lock:
+        profile = _profiles.get(site)
+        if profile is None:
+            profile = BoilerplateProfile(site)
+            path = _profile_file(site)
+            if os.path.isfile(path):
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        profile = BoilerplateProfile.from_dict(json.load(f))
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to read boilerplate profile {path}: {e}")
+            _profiles[site] = profile
+        return profile
+
+
+def strip_boilerplate(site: str, text: str, learn: bool = True, page_key: str | None = None) -> str:
+    """Remove site boilerplate from crawled content.
+
+    Args:
+        site (str): Site key, the crawler's DISPLAY_NAME.
+        text (str): Crawled content of one page.
+        learn (bool): Also count this page into the site's profile (once per page).
+        page_key (str): Stable page identity, e.g. its link; defaults to the content.
+
+    Returns:
+        str: text without lines recurring across the site's pages.
+    """
+    if not BOILERPLATE_ENABLED or not site:
+        return text or ''
+    profile = get_profile(site)
+    with _lock:
+        if learn:
+            profile.observe(text, page_key)
+        return profile.strip(text)
+
+
+def save_profiles():
+    """Persist every profile touched in this process."""
+    with _lock:
+        profiles = list(_profiles.values())
+        payloads = [(profile.site, profile.to_dict()) for profile in profiles]
+    try:
+        os.makedirs(BOILERPLATE_PATH, exist_ok=True)
+    except OSError as e:
+        logger.error(f"Failed to create {BOILERPLATE_PATH}: {e}")
+        return
+    for site, payload in payloads:
+        try:
+            with open(_profile_file(site), 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+        except (OSError, TypeError) as e:
+            logger.error(f"Failed to save boilerplate profile for {site}: {e}")
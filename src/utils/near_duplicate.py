@@ -0,0 +1,82 @@
+import re
+import datetime
+import logging
+import configparser
+
+from src.classifier.text_normalizer import normalize_text
+from src.string_management import AnnKey
+
+logger = logging.getLogger(__name__)
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+DEDUP_ENABLED = config.getint('Dedup', 'enabled', fallback=1) == 1
+# Sites publish the same regulation a few days apart
+DEDUP_MAX_DAY_GAP = config.getint('Dedup', 'max_day_gap', fallback=3)
+
+# Punctuation and brackets differ between sites (「」 vs "" vs none)
+_punct_re = re.compile(r'[^\w]')
+
+
+def _title_key(title: str) -> str:
+    return _punct_re.sub('', normalize_text(title or ''))
+
+
+def _site(ann: dict) -> str:
+    crawler = ann.get(AnnKey.CRAWLER.value)
+    return getattr(crawler, 'DISPLAY_NAME', None) or crawler.__class__.__name__
+
+
+def _parse_date(value) -> datetime.date | None:
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _dates_close(a, b, max_day_gap: int) -> bool:
+    date_a, date_b = _parse_date(a), _parse_date(b)
+    if date_a is None or date_b is None:
+        return a == b
+    return abs((date_a - date_b).days) <= max_day_gap
+
+
+def cluster_announcements(anns: list, max_day_gap: int = DEDUP_MAX_DAY_GAP) -> int:
+    """Mark announcements of a task that other sites also published.
+
+    Two announcements are duplicates only when they come from different sites,
+    their titles are identical once normalized (width, case, simplified
+    characters, punctuation) and they were published within max_day_gap days.
+    Amendments of different regulations share most of their title ("修正「...」
+    部分條文"), so similar titles are not enough. Within a site, equal titles
+    are distinct announcements. The first member of each cluster, in list
+    order, is its representative; every other member gets AnnKey.DUPLICATE_OF
+    set to the representative's index in anns.
+
+    Args:
+        anns (list): Announcement dicts of one task, in display order.
+        max_day_gap (int): Maximum days between publication dates.
+
+    Returns:
+        int: Number of announcements marked as duplicates.
+    """
+    representatives: dict[str, list[int]] = {}
+    marked = 0
+    for idx, ann in enumerate(anns):
+        ann.pop(AnnKey.DUPLICATE_OF.value, None)
+        key = _title_key(ann.get(AnnKey.TITLE.value))
+        if not key:
+            continue
+        site = _site(ann)
+        for other in representatives.get(key, ()):
+            if (_site(anns[other]) != site
+                    and _dates_close(ann.get(AnnKey.DATE.value), anns[other].get(AnnKey.DATE.value), max_day_gap)):
+                ann[AnnKey.DUPLICATE_OF.value] = other
+                marked += 1
+                break
+        else:
+            representatives.setdefault(key, []).append(idx)
+    logger.info(f"Marked {marked} of {len(anns)} announcements as duplicates")
+    return marked
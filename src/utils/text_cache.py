@@ -0,0 +1,61 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import configparser
+
+logger = logging.getLogger(__name__)
+
+config = configparser.ConfigParser()
+config.read('config.ini')
+# Kept outside OUTPUT_PATH: task output folders are removed with their task
+TEXT_CACHE_PATH = config.get('Outputdir', 'TEXT_CACHE_PATH', fallback='./text_cache')
+TEXT_CACHE_DAYS = config.getint('Outputdir', 'TEXT_CACHE_DAYS', fallback=60)
+
+
+def _cache_file(link: str) -> str:
+    return os.path.join(TEXT_CACHE_PATH, hashlib.sha256(link.encode('utf-8')).hexdigest() + '.json')
+
+
+def save_extracted_text(link: str, title: str, content: str, appendix_texts: dict) -> bool:
+    """Store the extracted text of an announcement so it can be re-classified without re-crawling."""
+    if not link:
+        return False
+    try:
+        os.makedirs(TEXT_CACHE_PATH, exist_ok=True)
+        with open(_cache_file(link), 'w', encoding='utf-8') as f:
+            json.dump({'link': link, 'title': title, 'content': content,
+                       'appendix_texts': appendix_texts}, f, ensure_ascii=False)
+        return True
+    except (OSError, TypeError) as e:
+        logger.error(f"Failed to cache extracted text for {link}: {e}")
+        return False
+
+
+def load_extracted_text(link: str) -> dict | None:
+    """Return {'title', 'content', 'appendix_texts'} cached for link, or None."""
+    if not link:
+        return None
+    path = _cache_file(link)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to read cached text {path}: {e}")
+        return None
+
+
+def prune_text_cache(max_age_days: int = TEXT_CACHE_DAYS):
+    """Remove cached texts older than max_age_days (same horizon as the messages TTL)."""
+    if not os.path.isdir(TEXT_CACHE_PATH):
+        return
+    cutoff = time.time() - max_age_days * 86400
+    for entry in os.scandir(TEXT_CACHE_PATH):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError as e:
+            logger.error(f"Failed to prune {entry.path}: {e}")
@@ -0,0 +1,47 @@
+from src.utils import boilerplate
+from src.utils.boilerplate import BoilerplateProfile
+
+REGULATION = "修正證券商管理規則第十八條\n本令自發布日施行\n金融監督管理委員會主任委員"
+
+
+def _footer_pages(count):
+    return [f"第{i}號公告內容，與其他頁面不同\n網站導覽 隱私權政策 資訊安全政策" for i in range(count)]
+
+
+def test_observing_the_same_page_again_is_ignored():
+    profile = BoilerplateProfile('site')
+    assert profile.observe(REGULATION, 'https://example.org/a')
+    for _ in range(10):
+        assert not profile.observe(REGULATION, 'https://example.org/a')
+    assert profile.pages == 1
+    assert profile.strip(REGULATION) == REGULATION
+
+
+def test_recrawled_page_keeps_its_body(monkeypatch, tmp_path):
+    monkeypatch.setattr(boilerplate, 'BOILERPLATE_ENABLED', True)
+    monkeypatch.setattr(boilerplate, 'BOILERPLATE_PATH', str(tmp_path))
+    monkeypatch.setattr(boilerplate, '_profiles', {})
+    for _ in range(6):
+        assert boilerplate.strip_boilerplate('testsite_x', REGULATION) == REGULATION
+
+
+def test_recrawl_does_not_change_what_is_stripped():
+    profile = BoilerplateProfile('site')
+    pages = _footer_pages(6)
+    for i, page in enumerate(pages):
+        profile.observe(page, f'link-{i}')
+    before = [profile.strip(page) for page in pages + [REGULATION]]
+    for i, page in enumerate(pages):
+        profile.observe(page, f'link-{i}')
+        profile.observe(page)
+    assert [profile.strip(page) for page in pages + [REGULATION]] == before
+    assert before[0] == "第0號公告內容，與其他頁面不同"
+    assert before[-1] == REGULATION
+
+
+def test_seen_pages_survive_persistence():
+    profile = BoilerplateProfile('site')
+    profile.observe(REGULATION, 'https://example.org/a')
+    restored = BoilerplateProfile.from_dict(profile.to_dict())
+    assert not restored.observe(REGULATION, 'https://example.org/a')
+    assert restored.pages == 1
@@ -0,0 +1,39 @@
+from src.string_management import AnnKey
+from src.utils.near_duplicate import cluster_announcements
+
+
+class _Crawler:
+    def __init__(self, name):
+        self.DISPLAY_NAME = name
+
+
+FSC = _Crawler('金管會')
+GAZETTE = _Crawler('行政院公報')
+
+
+def _ann(title, crawler, date='2026-10-01'):
+    return {AnnKey.TITLE.value: title, AnnKey.DATE.value: date, AnnKey.CRAWLER.value: crawler}
+
+
+def test_same_regulation_on_two_sites_is_clustered():
+    anns = [_ann('修正「證券商管理規則」第十八條', FSC),
+            _ann('修正"证券商管理规则"第十八条', GAZETTE, '2026-10-03')]
+    assert cluster_announcements(anns) == 1
+    assert anns[1][AnnKey.DUPLICATE_OF.value] == 0
+
+
+def test_different_regulations_with_similar_titles_are_not_clustered():
+    anns = [_ann('修正「證券商辦理有價證券買賣融資融券業務操作辦法」部分條文', FSC),
+            _ann('修正「證券金融事業辦理有價證券買賣融資融券業務操作辦法」部分條文', GAZETTE)]
+    assert cluster_announcements(anns) == 0
+    assert all(AnnKey.DUPLICATE_OF.value not in ann for ann in anns)
+
+
+def test_same_title_on_one_site_is_not_clustered():
+    anns = [_ann('公告修正證券商管理規則', FSC), _ann('公告修正證券商管理規則', FSC)]
+    assert cluster_announcements(anns) == 0
+
+
+def test_dates_too_far_apart_are_not_clustered():
+    anns = [_ann('修正證券商管理規則', FSC), _ann('修正證券商管理規則', GAZETTE, '2026-11-01')]
+    assert cluster_announcements(anns) == 0